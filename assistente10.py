@@ -8,6 +8,8 @@ import time
 import tkinter as tk
 import cv2
 import requests
+import json
+import re
 from threading import Thread
 from PIL import Image, ImageTk
 
@@ -18,23 +20,39 @@ root.geometry("600x600")
 
 # Carregar vídeo
 video_path = "wave.mp4"
-cap = cv2.VideoCapture(video_path)
 video_label = tk.Label(root)
 video_label.pack()
 
-def play_video():
-    """Executa o vídeo continuamente sem parar."""
+def carregar_frames(path, size=(400, 400)):
+    """Decodifica o vídeo uma única vez em um array RGB já convertido e redimensionado."""
+    cap = cv2.VideoCapture(path)
+    frames = []
     while True:
         ret, frame = cap.read()
         if not ret:
-            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-            continue
+            break
         frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        frame = cv2.resize(frame, (400, 400))
-        img = ImageTk.PhotoImage(Image.fromarray(frame))
+        frames.append(cv2.resize(frame, size))
+    cap.release()
+    if not frames:
+        print(f"Erro ao abrir o vídeo: {path}")
+        return None
+    return np.ascontiguousarray(np.stack(frames))
+
+# Quadros decodificados na inicialização; o laço do vídeo apenas os percorre
+frames = carregar_frames(video_path)
+
+def play_video():
+    """Executa o vídeo continuamente sem parar."""
+    if frames is None:
+        return
+    index = 0
+    while True:
+        img = ImageTk.PhotoImage(Image.fromarray(frames[index]))
         video_label.config(image=img)
         video_label.image = img
         root.update_idletasks()
+        index = (index + 1) % len(frames)
         time.sleep(1 / 30)  # Mantém 30 FPS para animação fluida
 
 # Iniciar o vídeo em um thread separado
@@ -54,8 +72,12 @@ def speak(text, speed=1.0):
     while pygame.mixer.music.get_busy():
         root.update_idletasks()  # Mantém a interface responsiva
 
-def ask_local_llm(question):
-    """Consulta o servidor local LLM e retorna a resposta."""
+# Separa o texto em frases: corta após . ! ? ou … seguidos de espaço
+FIM_DE_FRASE = re.compile(r'(?<=[.!?…])\s+')
+
+def ask_local_llm_stream(question):
+    """Consulta o servidor local LLM em modo streaming (SSE) e gera a resposta frase a frase."""
+    yielded = False
     try:
         url = "http://localhost:1234/v1/chat/completions"
         payload = {
@@ -66,17 +88,44 @@ def ask_local_llm(question):
             ],
             "temperature": 0.7,
             "max_tokens": 50,
-            "stream": False
+            "stream": True
         }
-        headers = {"Content-Type": "application/json"}
-        response = requests.post(url, json=payload, headers=headers)
-        if response.status_code == 200:
-            return response.json()["choices"][0]["message"]["content"].strip()
-        else:
-            return "Erro ao obter resposta do servidor local."
+        headers = {"Content-Type": "application/json", "Accept": "text/event-stream"}
+        response = requests.post(url, json=payload, headers=headers, stream=True)
+        if response.status_code != 200:
+            yield "Erro ao obter resposta do servidor local."
+            return
+
+        buffer = ""
+        for raw_line in response.iter_lines():
+            # Cada evento SSE vem como "data: {json}"
+            line = raw_line.decode('utf-8', errors='replace').strip()
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+
+            delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+            if not delta:
+                continue
+            buffer += delta
+
+            # Entrega todas as frases completas e mantém o resto no buffer
+            partes = FIM_DE_FRASE.split(buffer)
+            for frase in partes[:-1]:
+                if frase.strip():
+                    yielded = True
+                    yield frase.strip()
+            buffer = partes[-1]
+
+        if buffer.strip():
+            yielded = True
+            yield buffer.strip()
     except Exception as e:
         print("Erro ao se comunicar com o servidor local:", e)
-        return "Desculpe, não consegui obter uma resposta no momento."
+        if not yielded:
+            yield "Desculpe, não consegui obter uma resposta no momento."
 
 def evento_patrocinador():
     """Escolhe aleatoriamente um patrocinador para o evento."""
@@ -93,8 +142,9 @@ def iniciar_conversa():
     
     comando = listen()
     if comando:
-        resposta = ask_local_llm(comando)
-        speak(resposta, speed=1.0)
+        # Fala cada frase assim que o LLM termina de gerá-la
+        for frase in ask_local_llm_stream(comando):
+            speak(frase, speed=1.0)
 
 def listen():
     """Captura o áudio do microfone e converte em texto."""
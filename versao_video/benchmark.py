@@ -0,0 +1,376 @@
+"""Benchmark sem interface: repete sessões gravadas pelo motor do assistente.
+
+Cada visitante é simulado com o mesmo caminho do quiosque:
+motor.processar_linha_serial("LED_ON") -> saudação -> listen() -> LLM -> fala.
+O microfone é alimentado com arquivos WAV (ou falas sintéticas), o LLM é o
+servidor de teste local, e a síntese/reprodução de fala são simuladas.
+No fim, mostra a vazão (visitantes por hora) e os percentis p50/p95 de
+cada etapa medidos pelo LatencyTracer.
+
+Uso:
+    python benchmark.py --wavs gravacoes/ --primeiro-token 0.4 --atraso-token 0.03
+    python benchmark.py --sinteticos 5 --json resultado.json
+
+Cada WAV pode ter um .txt com o mesmo nome contendo a transcrição
+esperada; sem ele, o nome do arquivo é usado como pergunta.
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import tempfile
+import time
+import wave
+from threading import Event, Thread
+
+import numpy as np
+import speech_recognition as sr
+
+import motor as assistente
+from servidor_llm_teste import iniciar_servidor
+
+PERGUNTAS_SINTETICAS = ["Onde fica o banheiro?",
+                        "Quem patrocina o evento?",
+                        "Que horas o evento acaba?",
+                        "Onde é a palestra principal?"]
+
+def carregar_wav(path, sample_rate):
+    """Lê um WAV e o converte para PCM 16 bits mono na taxa pedida."""
+    with wave.open(path, "rb") as wav:
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        rate = wav.getframerate()
+        data = wav.readframes(wav.getnframes())
+
+    dtype = {1: np.uint8, 2: np.int16, 4: np.int32}[width]
+    samples = np.frombuffer(data, dtype=dtype).astype(np.float32)
+    if width == 1:
+        samples = (samples - 128) * 256
+    elif width == 4:
+        samples /= 65536
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    if rate != sample_rate and len(samples):
+        # Reamostragem linear, suficiente para alimentar o VAD e o STT
+        positions = np.arange(0, len(samples), rate / sample_rate)
+        samples = np.interp(positions, np.arange(len(samples)), samples)
+    return np.clip(samples, -32768, 32767).astype(np.int16).tobytes()
+
+def fala_sintetica(sample_rate, seconds=1.5, seed=0):
+    """Gera um trecho com energia e ritmo de fala para o VAD (sem conteúdo real)."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    # Tom com modulação de amplitude de ~4 Hz, parecido com o ritmo das sílabas
+    envelope = 0.6 + 0.4 * np.sin(2 * np.pi * 4 * t)
+    signal = 4000 * envelope * np.sin(2 * np.pi * 180 * t) + rng.normal(0, 80, len(t))
+    return signal.astype(np.int16).tobytes()
+
+def carregar_sessoes(args, sample_rate):
+    """Retorna a lista de (pcm, transcrição) dos visitantes a simular."""
+    sessoes = []
+    if args.wavs:
+        for path in sorted(glob.glob(os.path.join(args.wavs, "*.wav"))):
+            texto_path = os.path.splitext(path)[0] + ".txt"
+            if os.path.exists(texto_path):
+                with open(texto_path, encoding="utf-8") as f:
+                    texto = f.read().strip()
+            else:
+                texto = os.path.splitext(os.path.basename(path))[0].replace("_", " ")
+            sessoes.append((carregar_wav(path, sample_rate), texto))
+    else:
+        for i in range(args.sinteticos):
+            sessoes.append((fala_sintetica(sample_rate, seed=i), PERGUNTAS_SINTETICAS[i % len(PERGUNTAS_SINTETICAS)]))
+    return sessoes * args.repeticoes
+
+class StubTTSEngine:
+    """Síntese simulada: WAV silencioso com duração proporcional ao texto."""
+
+    name = "stub"
+    fmt = "wav"
+    cacheable = False
+
+    def __init__(self, delay=0.0, seconds_per_word=0.35, sample_rate=16000):
+        self.delay = delay
+        self.seconds_per_word = seconds_per_word
+        self.sample_rate = sample_rate
+
+    def synthesize(self, text, lang='pt', slow=False):
+        time.sleep(self.delay)
+        seconds = max(0.3, len(text.split()) * self.seconds_per_word)
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(self.sample_rate)
+            wav.writeframes(b"\0\0" * int(seconds * self.sample_rate))
+        return buffer.getvalue()
+
+class SimulatedAudioOutput:
+    """Saída de áudio simulada: "toca" pelo tempo que o áudio duraria, sem dispositivo."""
+
+    def __init__(self, realtime=True):
+        self.realtime = realtime
+        self.finished = Event()
+        self.finished.set()
+        self._ends_at = 0.0
+
+    def start(self):
+        pass
+
+    def play(self, audio):
+        self.finished.clear()
+        self._ends_at = time.monotonic() + (self._duration(audio) if self.realtime else 0.0)
+
+    def wait(self):
+        remaining = self._ends_at - time.monotonic()
+        if remaining > 0:
+            self.finished.wait(remaining)
+        self.finished.set()
+
+    def play_effect(self, sound_path):
+        pass
+
+    def ends_at(self):
+        return self._ends_at
+
+    def stop(self):
+        self._ends_at = min(self._ends_at, time.monotonic())
+        self.finished.set()
+
+    @staticmethod
+    def _duration(audio):
+        if isinstance(audio, tuple):
+            data, fmt = audio
+            source = io.BytesIO(data)
+        else:
+            fmt = os.path.splitext(audio)[1].lstrip(".")
+            source = audio
+        if fmt != "wav":
+            return 0.0
+        with wave.open(source, "rb") as wav:
+            return wav.getnframes() / wav.getframerate()
+
+class ScriptedRecognizer:
+    """Reconhecimento simulado: devolve a transcrição esperada do WAV em reprodução."""
+
+    name = "roteiro"
+    streaming = False
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.text = ""
+
+    def load(self):
+        pass
+
+    def transcribe(self, audio):
+        time.sleep(self.delay)
+        if not self.text:
+            raise sr.UnknownValueError()
+        return self.text
+
+class MicFeeder:
+    """Alimenta o MicrophoneRing em tempo real com ruído de fundo e as falas injetadas."""
+
+    def __init__(self, ring, noise_rms=80.0):
+        self.ring = ring
+        self.noise_rms = noise_rms
+        self._pending = b""
+        self._rng = np.random.default_rng(1)
+        self._stop = Event()
+
+    def noise_frame(self):
+        return self._rng.normal(0, self.noise_rms, self.ring.frame_samples).astype(np.int16).tobytes()
+
+    def inject(self, pcm):
+        self._pending += pcm
+
+    def start(self):
+        Thread(target=self._run, daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        frame_bytes = self.ring.frame_samples * 2
+        period = self.ring.frame_samples / self.ring.sample_rate
+        deadline = time.monotonic()
+        while not self._stop.is_set():
+            if self._pending:
+                frame, self._pending = self._pending[:frame_bytes], self._pending[frame_bytes:]
+                frame = frame.ljust(frame_bytes, b"\0")
+            else:
+                frame = self.noise_frame()
+            self.ring.write(frame)
+            deadline += period
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+def aguardar(condicao, timeout):
+    """Espera a condição ficar verdadeira; retorna False se o tempo acabar."""
+    limite = time.monotonic() + timeout
+    while not condicao():
+        if time.monotonic() > limite:
+            return False
+        time.sleep(0.01)
+    return True
+
+def simular_visitante(motor, enviar_linha, pcm, texto, feeder, recognizer, escutando, respondendo, reacao, timeout,
+                      interromper=False, perguntas=1):
+    """Dispara o sensor, responde quando o assistente começa a ouvir e espera o fim da conversa.
+
+    enviar_linha(linha) entrega uma linha do Arduino ao motor e retorna
+    False se ela foi recusada. escutando e respondendo são os Events
+    ligados aos eventos "escutando" e "falando" (início) do motor. O
+    visitante faz a mesma pergunta perguntas vezes na sessão e depois fica
+    em silêncio; retorna False se alguma ficar sem resposta. Com
+    interromper=True a primeira pergunta é feita durante a saudação,
+    reacao segundos após o gatilho, sem esperar o assistente terminar.
+    """
+    recognizer.text = texto
+    escutando.clear()
+    if enviar_linha("LED_ON") is False:
+        return False
+    if not aguardar(lambda: motor.tracer.current is not None, timeout):
+        return False
+    for i in range(perguntas):
+        if not (interromper and i == 0):
+            if not escutando.wait(timeout):
+                return False
+            escutando.clear()
+        time.sleep(reacao)
+        respondendo.clear()
+        feeder.inject(pcm)
+        if interromper and i == 0:
+            # A escuta da pergunta dita durante a saudação só começa agora;
+            # o aviso dela não pode liberar a pergunta seguinte
+            if not escutando.wait(timeout):
+                return False
+            escutando.clear()
+        # A pergunta só conta como respondida quando o assistente volta a falar
+        if not respondendo.wait(timeout):
+            return False
+    return aguardar(lambda: motor.tracer.current is None, timeout)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline do assistente virtual")
+    parser.add_argument("--wavs", help="pasta com as falas gravadas (.wav e .txt opcional)")
+    parser.add_argument("--sinteticos", type=int, default=4, help="número de falas sintéticas sem --wavs")
+    parser.add_argument("--repeticoes", type=int, default=1, help="quantas vezes repetir as sessões")
+    parser.add_argument("--serial", help="arquivo com as linhas do Arduino; cada LED_ON é um visitante")
+    parser.add_argument("--pty", action="store_true",
+                        help="envia as linhas por um sensor falso (pty) e pelo leitor serial do motor")
+    parser.add_argument("--cooldown", type=float, default=0.0, help="intervalo mínimo (s) entre conversas")
+    parser.add_argument("--primeiro-token", type=float, default=0.3, help="atraso (s) do LLM até o primeiro token")
+    parser.add_argument("--atraso-token", type=float, default=0.02, help="atraso (s) do LLM entre tokens")
+    parser.add_argument("--atraso-tts", type=float, default=0.1, help="atraso (s) da síntese simulada")
+    parser.add_argument("--atraso-stt", type=float, default=0.2, help="atraso (s) do reconhecimento simulado")
+    parser.add_argument("--stt", choices=["roteiro", "vosk"], default="roteiro")
+    parser.add_argument("--tts", choices=["stub", "real"], default="stub")
+    parser.add_argument("--reproducao", choices=["real", "instantanea"], default="real",
+                        help="tocar a fala simulada pelo tempo real do áudio ou instantaneamente")
+    parser.add_argument("--reacao", type=float, default=0.3, help="tempo (s) até o visitante começar a falar")
+    parser.add_argument("--perguntas", type=int, default=1, help="perguntas feitas por visitante na sessão")
+    parser.add_argument("--interromper", action="store_true",
+                        help="o visitante fala durante a saudação (reacao conta a partir do gatilho)")
+    parser.add_argument("--cache-respostas", action="store_true", help="mantém o cache de respostas do LLM")
+    parser.add_argument("--timeout", type=float, default=60.0, help="tempo máximo (s) por visitante")
+    parser.add_argument("--jsonl", help="arquivo para as linhas do tempo de cada conversa")
+    parser.add_argument("--json", help="arquivo para o resumo final em JSON")
+    args = parser.parse_args()
+
+    # Motor com as partes externas substituídas pelas simulações
+    server = iniciar_servidor(first_token_delay=args.primeiro_token, token_delay=args.atraso_token)
+    if args.stt == "vosk":
+        recognizer = assistente.criar_reconhecedor("vosk")
+        recognizer.load()
+    else:
+        recognizer = ScriptedRecognizer(delay=args.atraso_stt)
+    motor = assistente.AssistenteMotor(
+        tts_service=assistente.TTSService(StubTTSEngine(delay=args.atraso_tts)) if args.tts == "stub" else None,
+        llm_client=assistente.LLMClient(url=server.url),
+        stt_backend=recognizer,
+        audio_output=SimulatedAudioOutput(realtime=args.reproducao == "real"),
+        tracer=assistente.LatencyTracer(
+            path=args.jsonl or os.path.join(tempfile.gettempdir(), "benchmark_latencias.jsonl"), summary_every=0),
+        answer_cache=None if args.cache_respostas else assistente.AnswerCache(ttl=0),
+        sensor_cooldown=args.cooldown,
+        # O rodízio começa do zero e não altera as exibições do quiosque
+        sponsors=assistente.SponsorRotation(assistente.carregar_patrocinadores(), state_path=None),
+        # A fala simulada não chega ao microfone (sem eco): a interrupção só é testada se pedida
+        barge_in=args.interromper)
+
+    if args.pty:
+        from sensor_falso import SensorFalso
+        sensor = SensorFalso()
+        # Só o sensor falso: nada de outras portas nem de lembrar a porta do pty
+        motor.iniciar_sensor(sensor.port, last_port_file=None, find_ports=list)
+        enviar_linha = sensor.enviar
+    else:
+        sensor = None
+        enviar_linha = motor.processar_linha_serial
+
+    escutando = Event()
+    motor.on("escutando", escutando.set)
+    respondendo = Event()
+    motor.on("falando", lambda ativo: ativo and respondendo.set())
+
+    feeder = MicFeeder(motor.mic_ring)
+    motor.vad.calibrate([feeder.noise_frame() for _ in range(20)])
+    feeder.start()
+
+    sessoes = carregar_sessoes(args, motor.mic_ring.sample_rate)
+    linhas = ["LED_ON"] * len(sessoes)
+    if args.serial:
+        with open(args.serial, encoding="utf-8") as f:
+            linhas = [linha.strip() for linha in f if linha.strip()]
+
+    print(f"Simulando {len(sessoes)} visitantes (LLM de teste em {server.url})")
+    inicio = time.monotonic()
+    atendidos = 0
+    falhas = 0
+    for linha in linhas:
+        if "LED_ON" not in linha:
+            enviar_linha(linha)
+            continue
+        if atendidos + falhas >= len(sessoes):
+            break
+        pcm, texto = sessoes[atendidos + falhas]
+        if simular_visitante(motor, enviar_linha, pcm, texto, feeder, recognizer, escutando, respondendo,
+                             args.reacao, args.timeout, args.interromper, args.perguntas):
+            atendidos += 1
+        else:
+            falhas += 1
+            print(f"Visitante não concluído: {texto}")
+    duracao = time.monotonic() - inicio
+
+    feeder.stop()
+    server.shutdown()
+    motor.fechar()
+    if sensor:
+        sensor.fechar()
+
+    resumo = {
+        "visitantes": atendidos,
+        "falhas": falhas,
+        "duracao_s": round(duracao, 3),
+        "visitantes_por_hora": round(atendidos * 3600 / duracao, 1) if duracao else 0.0,
+        "etapas": motor.tracer.summary(),
+        "patrocinadores": dict(motor.patrocinios.impressions),
+        "gatilhos": motor.gatilhos.stats(),
+    }
+    print(f"\n{atendidos} visitantes em {duracao:.1f}s ({resumo['visitantes_por_hora']} por hora), {falhas} falhas")
+    motor.tracer.print_summary()
+    gatilhos = resumo["gatilhos"]
+    print(f"Gatilhos: {gatilhos['accepted']} aceitos, {gatilhos['served']} atendidos, "
+          f"{gatilhos['failed']} sem resposta, {gatilhos['dropped']} descartados "
+          f"({gatilhos['coalesced']} agrupados, {gatilhos['rejected']} recusados)")
+    print("Exibições por patrocinador: " + ", ".join(f"{k}={v}" for k, v in resumo["patrocinadores"].items()))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resumo, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2514 @@
+"""Motor do assistente virtual: sensor, escuta, LLM e fala, sem interface gráfica.
+
+A janela do quiosque (assistente16.py) e as medições (benchmark.py) usam
+AssistenteMotor e acompanham a conversa pelos eventos que ele emite.
+Também roda sozinho, sem janela:
+
+    python motor.py
+"""
+import argparse
+import asyncio
+import importlib
+import importlib.util
+import os
+import sys
+import glob
+import io
+import time
+# Referência para o relatório de inicialização (antes das demais importações)
+INICIO_PROCESSO = time.perf_counter()
+import numpy as np
+from threading import Thread, Event, Lock, Condition
+import tempfile
+import uuid
+import hashlib
+import shutil
+import subprocess
+import json
+import re
+import queue
+import random
+import math
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from collections import OrderedDict, deque
+
+# === CONFIGURAÇÃO DA PORTA SERIAL ===
+# Altere esta variável para definir qual porta COM usar
+# Exemplo: "COM3", "COM4", etc.
+# Deixe como None para detecção automática
+PORTA_COM = "COM10"  # <-- ALTERE AQUI PARA SUA PORTA
+
+# === SENSOR NA PORTA SERIAL ===
+SERIAL_BAUDRATE = 9600
+# Linha enviada pelo Arduino quando detecta um visitante
+SINAL_ENTRADA = "LED_ON"
+# Linha que indica que o visitante saiu (ex.: "LED_OFF"); a conversa em
+# andamento é cancelada. None ignora a saída do visitante
+SINAL_SAIDA = None
+# Sinais de entrada a menos deste tempo (s) do anterior, ou do fim de uma
+# conversa, são agrupados como o mesmo visitante ainda parado no sensor
+SENSOR_COOLDOWN = 3.0
+# Visitante que chega durante uma conversa espera na fila (no máximo um) por
+# até este tempo (s); depois disso provavelmente já foi embora
+VISITANTE_ESPERA_MAX = 30.0
+# Espera (s) entre tentativas de reconexão, dobrando a cada falha até o máximo
+SERIAL_RECONNECT_MIN = 1.0
+SERIAL_RECONNECT_MAX = 30.0
+# Sem nenhuma porta candidata, procura de novo a cada SERIAL_SCAN_INTERVAL (s);
+# a busca só lista /dev ou o registro do Windows, sem abrir portas
+SERIAL_SCAN_INTERVAL = 0.1
+# Tempo máximo (s) esperando as portas candidatas abrirem (abertas em paralelo)
+SERIAL_PROBE_TIMEOUT = 2.0
+# Última porta em que o sensor funcionou; é a primeira tentada ao reiniciar
+SERIAL_LAST_PORT_FILE = os.path.join(tempfile.gettempdir(), "assistente_ultima_porta.txt")
+# Tamanho máximo (bytes) de uma linha; o excesso do início dela é descartado (ruído)
+SERIAL_MAX_LINE = 256
+
+# Sons de feedback - substitua por caminhos completos se necessário
+LISTEN_CHIME_PATH = os.path.join(os.path.dirname(__file__), "listen_chime.mp3")
+ERROR_SOUND_PATH = os.path.join(os.path.dirname(__file__), "error.mp3")
+
+# Pasta temporária para os caches (áudios, quadros de vídeo, medições)
+TEMP_DIR = tempfile.gettempdir()
+
+# === CACHE DE ÁUDIO TTS ===
+# Pasta onde os áudios gerados pelo gTTS ficam guardados entre execuções
+TTS_CACHE_DIR = os.path.join(TEMP_DIR, "assistente_tts_cache")
+# Tamanho máximo do cache em bytes (os mais antigos são removidos primeiro)
+TTS_CACHE_MAX_BYTES = 50 * 1024 * 1024
+# Quantos áudios já decodificados em PCM ficam na memória para tocar de novo
+# sem decodificar (frases fixas, avisos de erro)
+AUDIO_PCM_CACHE_ITEMS = 32
+
+# === SAUDAÇÕES PRÉ-MONTADAS ===
+# Pasta do pacote com uma saudação contínua por patrocinador
+# (boas-vindas + patrocinador + pedido de pergunta), pronta para tocar
+SAUDACOES_DIR = os.path.join(TEMP_DIR, "assistente_saudacoes")
+# Silêncio (s) inserido entre as frases depois de aparadas
+SAUDACAO_PAUSA = 0.25
+# Amplitude (fração do máximo) abaixo da qual o início e o fim de cada frase são silêncio
+SAUDACAO_LIMIAR_SILENCIO = 0.01
+# Margem (s) mantida antes e depois do som, para não cortar consoantes
+SAUDACAO_MARGEM = 0.03
+
+# === SERVIDOR LLM LOCAL ===
+LLM_URL = "http://localhost:1234/v1/chat/completions"
+LLM_MODEL = "hermes-3-llama-3.2-3b"
+LLM_SYSTEM_PROMPT = "Você é um assistente virtual. Sempre responda apenas em português do Brasil e limite sua resposta a 50 palavras. seja formal"
+# Tempo máximo (s) para conectar ao servidor e para esperar dados da resposta
+LLM_CONNECT_TIMEOUT = 3.0
+LLM_READ_TIMEOUT = 30.0
+# Com streaming ativo, cada frase é falada assim que o LLM termina de gerá-la
+LLM_STREAMING = True
+
+# === RECONHECIMENTO DE FALA ===
+# "google": reconhecimento online (recognize_google)
+# "vosk": reconhecimento local na CPU, funciona sem internet
+STT_ENGINE = "google"
+STT_LANGUAGE = "pt-BR"
+# Pasta do modelo Vosk em português (ex.: vosk-model-small-pt-0.3)
+VOSK_MODEL_PATH = os.path.join(os.path.dirname(__file__), "vosk-model-small-pt-0.3")
+
+# === DETECÇÃO DE VOZ (VAD) ===
+# Áudio capturado em 16 kHz mono, analisado em quadros de 30 ms
+VAD_SAMPLE_RATE = 16000
+VAD_FRAME_MS = 30
+# Silêncio (s) após a fala que encerra a captura
+VAD_END_SILENCE = 0.6
+# Duração máxima (s) de uma pergunta; a captura é encerrada ao atingi-la
+VAD_MAX_PHRASE = 10.0
+# Tempo máximo (s) esperando o visitante começar a falar
+VAD_START_TIMEOUT = 6.0
+# Fala contínua mínima (s) para considerar que a fala começou
+VAD_MIN_SPEECH = 0.09
+# Áudio (s) anterior ao início da fala que também vai para o reconhecimento
+VAD_PRE_SPEECH = 0.3
+# Um quadro é fala se a energia passar este múltiplo do ruído ambiente...
+VAD_ENERGY_RATIO = 3.0
+# ...e também este valor absoluto (RMS em amostras de 16 bits)
+VAD_MIN_RMS = 300.0
+# Quadros com mais cruzamentos por zero que isto são chiado, não voz
+VAD_MAX_ZCR = 0.35
+# Tempo (s) de áudio usado na calibração inicial do ruído ambiente
+VAD_CALIBRATION = 0.5
+
+# === INTERRUPÇÃO DA SAUDAÇÃO (BARGE-IN) ===
+# O visitante pode falar durante a saudação: a reprodução para e a escuta
+# começa na hora, sem esperar as três frases terminarem.
+# Desligado por padrão: o único filtro contra o som do próprio alto-falante
+# é o limiar abaixo, e o eco no microfone do quiosque pode passar dele e
+# interromper a saudação sozinho. Ligue só depois de testar no equipamento
+# do evento, com o volume de uso
+BARGE_IN = False
+# Durante a reprodução o som do alto-falante também chega ao microfone, então
+# a voz do visitante precisa passar este múltiplo do ruído ambiente...
+BARGE_IN_ENERGY_RATIO = 6.0
+# ...por pelo menos este tempo (s) para interromper a fala
+BARGE_IN_MIN_SPEECH = 0.25
+
+# === CAPTURA CONTÍNUA DO MICROFONE ===
+# Duração (s) do buffer circular com o áudio mais recente do microfone
+MIC_BUFFER_SECONDS = 10.0
+# Áudio (s) anterior ao início da escuta incluído na captura, para não
+# perder as primeiras sílabas ditas logo após o som de aviso; nunca volta
+# até o som do próprio quiosque
+MIC_PRE_ROLL = 0.4
+# Tempo (s) após o fim do som do quiosque em que o eco da sala ainda chega ao microfone
+MIC_ECHO_TAIL = 0.15
+# Tempo máximo (s) sem receber áudio do microfone antes de considerar falha
+MIC_READ_TIMEOUT = 2.0
+
+# === MEDIÇÃO DE LATÊNCIA ===
+# Arquivo JSON lines com a linha do tempo de cada conversa
+TRACE_PATH = os.path.join(TEMP_DIR, "assistente_latencias.jsonl")
+# A cada quantas conversas o resumo p50/p95 é mostrado no console
+TRACE_SUMMARY_EVERY = 10
+# Quantas medições por etapa entram no cálculo dos percentis
+TRACE_HISTORY = 500
+
+# === CACHE DE RESPOSTAS ===
+# Tempo (s) que uma resposta do LLM continua válida no cache
+ANSWER_CACHE_TTL = 30 * 60
+# Similaridade mínima (0 a 1) para reaproveitar a resposta de uma pergunta
+# parecida; use None para aceitar apenas perguntas iguais após normalização
+ANSWER_CACHE_SIMILARITY = 0.8
+# Número máximo de perguntas guardadas
+ANSWER_CACHE_MAX_ENTRIES = 200
+
+# === SESSÃO COM VÁRIAS PERGUNTAS ===
+# Quantas perguntas o visitante pode fazer por ativação do sensor (1 desativa)
+SESSAO_MAX_PERGUNTAS = 3
+# Silêncio (s) esperando a próxima pergunta antes de encerrar a sessão
+SESSAO_SILENCIO = 5.0
+# Orçamento (tokens estimados) das perguntas e respostas anteriores enviadas ao LLM
+LLM_HISTORY_TOKENS = 600
+
+# === ORQUESTRAÇÃO DA CONVERSA ===
+# Prazo máximo (s) de cada etapa; ao estourar, a conversa é encerrada
+PRAZO_SAUDACAO = 30.0
+PRAZO_ESCUTA = VAD_START_TIMEOUT + VAD_MAX_PHRASE + 10.0  # captura + reconhecimento
+PRAZO_RESPOSTA = 60.0
+# O LLM é aquecido durante a saudação se ficou ocioso por mais que isto (s)
+LLM_AQUECER_APOS = 120.0
+
+# Separa o texto em frases: corta após . ! ? ou … seguidos de espaço
+FIM_DE_FRASE = re.compile(r'(?<=[.!?…])\s+')
+
+# === SÍNTESE DE FALA ===
+# "gtts": voz do Google (online) | "espeak": espeak-ng local na CPU (offline)
+TTS_ENGINE = "gtts"
+# Mecanismo usado quando o principal falha ou demora demais (None desativa)
+TTS_FALLBACK_ENGINE = "espeak"
+# Tempo máximo (s) de espera pelo gTTS antes de usar o mecanismo reserva
+TTS_NETWORK_TIMEOUT = 4.0
+# Depois de uma falha, o mecanismo principal fica desativado por este tempo (s)
+TTS_FALLBACK_COOLDOWN = 60.0
+# Voz e velocidade (palavras por minuto) do espeak-ng
+ESPEAK_VOICE = "pt-br"
+ESPEAK_SPEED = 160
+
+# Frases fixas faladas a cada visitante
+FRASE_BOAS_VINDAS = "Bem-vindo à SEMAD e à SE INFO"
+FRASE_PEDIR_PERGUNTA = "Se precisar de ajuda, faça uma pergunta."
+
+# === PATROCINADORES ===
+# Patrocinadores do evento: lista de {"id", "frase", "peso"}; peso 2 toca o
+# dobro de vezes por rodada e peso 0 tira o patrocinador do rodízio
+PATROCINADORES_PATH = os.path.join(os.path.dirname(__file__), "patrocinadores.json")
+# Exibições de cada patrocinador e posição do rodízio, mantidas entre execuções
+PATROCINADORES_ESTADO_PATH = os.path.join(TEMP_DIR, "assistente_patrocinadores_estado.json")
+
+# Tentativa de importar serial - tratando possíveis erros
+try:
+    import serial
+    try:
+        import serial.tools.list_ports
+        SERIAL_TOOLS_AVAILABLE = True
+    except ImportError:
+        SERIAL_TOOLS_AVAILABLE = False
+        print("Módulo serial.tools não encontrado. Usando método alternativo.")
+except ImportError:
+    serial = None
+    SERIAL_TOOLS_AVAILABLE = False
+    print("Módulo serial não encontrado. Por favor, instale com 'pip install pyserial'")
+
+# Reconhecimento local é opcional: só é necessário com STT_ENGINE = "vosk".
+# Só verifica se está instalado; o módulo é importado ao carregar o modelo
+VOSK_AVAILABLE = importlib.util.find_spec("vosk") is not None
+
+# Tempo (s) gasto na primeira importação de cada módulo pesado
+TEMPOS_IMPORTACAO = {}
+
+def importar(nome):
+    """Importa um módulo pesado (pygame, gTTS, requests...) só quando ele é usado.
+
+    Assim a janela abre sem esperar por eles; iniciar_servicos() os
+    carrega em segundo plano. O tempo da primeira importação fica em
+    TEMPOS_IMPORTACAO para o relatório de inicialização.
+    """
+    if nome in TEMPOS_IMPORTACAO:
+        return importlib.import_module(nome)
+    start = time.perf_counter()
+    module = importlib.import_module(nome)
+    TEMPOS_IMPORTACAO.setdefault(nome, time.perf_counter() - start)
+    return module
+
+class StartupReport:
+    """Duração de cada etapa da inicialização e quando ela ficou pronta.
+
+    Os instantes são contados a partir de start (por padrão, a criação do
+    relatório); as importações vêm de TEMPOS_IMPORTACAO.
+    """
+
+    def __init__(self, start=None):
+        self.start = start if start is not None else time.perf_counter()
+        self.stages = []
+        self._lock = Lock()
+
+    @contextmanager
+    def stage(self, name):
+        begin = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self.stages.append((name, end - begin, end - self.start, ok))
+
+    def run(self, name, func, *args):
+        """Executa func(*args) como uma etapa; um erro é mostrado sem derrubar as outras."""
+        try:
+            with self.stage(name):
+                return func(*args)
+        except Exception as e:
+            print(f"Erro na inicialização ({name}): {e}")
+            return None
+
+    def print_report(self):
+        with self._lock:
+            stages = sorted(self.stages, key=lambda stage: stage[2])
+        print("Inicialização (s):")
+        for name, duration, ready, ok in stages:
+            print(f"  {name:<24} {duration:7.3f}  pronto em {ready:7.3f}{'' if ok else '  (falhou)'}")
+        print("Importações (s):")
+        for name, duration in sorted(TEMPOS_IMPORTACAO.items(), key=lambda item: -item[1]):
+            print(f"  {name:<24} {duration:7.3f}")
+
+class TurnTrace:
+    """Linha do tempo de uma conversa: etapas (spans) e marcos, em segundos desde o gatilho."""
+
+    def __init__(self, trigger, start=None):
+        self.trigger = trigger
+        self.start = start if start is not None else time.monotonic()
+        self.wall_time = time.time() - (time.monotonic() - self.start)
+        self.spans = []
+        self.marks = {}
+        self._lock = Lock()
+
+    def now(self):
+        return time.monotonic() - self.start
+
+    def mark(self, name):
+        """Registra um instante (só a primeira ocorrência de cada nome)."""
+        with self._lock:
+            self.marks.setdefault(name, round(self.now(), 4))
+
+    def add_span(self, name, start, end):
+        with self._lock:
+            self.spans.append({"name": name, "start": round(start, 4), "end": round(end, 4)})
+
+    def durations(self):
+        """Duração de cada etapa e as esperas derivadas que o visitante sente."""
+        result = {}
+        with self._lock:
+            for span in self.spans:
+                result.setdefault(span["name"], []).append(span["end"] - span["start"])
+            marks = dict(self.marks)
+            playbacks = [span["start"] for span in self.spans if span["name"] == "playback"]
+        if playbacks:
+            result["primeiro_audio"] = [min(playbacks)]
+        # Do fim da fala do visitante até o início da resposta falada
+        if "vad_end" in marks:
+            after = [t for t in playbacks if t >= marks["vad_end"]]
+            if after:
+                result["espera_resposta"] = [min(after) - marks["vad_end"]]
+        if "llm_first_token" in marks and "llm_request" in marks:
+            result["llm_primeiro_token"] = [marks["llm_first_token"] - marks["llm_request"]]
+        return result
+
+    def to_dict(self):
+        with self._lock:
+            return {"trigger": self.trigger, "time": round(self.wall_time, 3),
+                    "total": round(self.now(), 4), "marks": dict(self.marks), "spans": list(self.spans)}
+
+class LatencyTracer:
+    """Registra a linha do tempo de cada conversa em JSON lines e resume p50/p95 por etapa.
+
+    Só há uma conversa ativa por vez, então as etapas do pipeline usam
+    tracer.span()/tracer.mark() sem receber a conversa por parâmetro;
+    fora de uma conversa essas chamadas não fazem nada.
+    """
+
+    def __init__(self, path=TRACE_PATH, summary_every=TRACE_SUMMARY_EVERY, history=TRACE_HISTORY):
+        self.path = path
+        self.summary_every = summary_every
+        self.history = history
+        self.current = None
+        self.turns = 0
+        self._durations = {}
+        self._lock = Lock()
+
+    def start_turn(self, trigger, start=None):
+        self.current = TurnTrace(trigger, start)
+        self.current.mark("trigger")
+        return self.current
+
+    def mark(self, name):
+        turn = self.current
+        if turn:
+            turn.mark(name)
+
+    @contextmanager
+    def span(self, name):
+        turn = self.current
+        if turn is None:
+            yield
+            return
+        start = turn.now()
+        try:
+            yield
+        finally:
+            turn.add_span(name, start, turn.now())
+
+    def finish_turn(self):
+        turn, self.current = self.current, None
+        if turn is None:
+            return
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(turn.to_dict(), ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"Erro ao gravar medições de latência: {e}")
+
+        with self._lock:
+            for name, values in turn.durations().items():
+                self._durations.setdefault(name, deque(maxlen=self.history)).extend(values)
+            self.turns += 1
+            show = self.summary_every and self.turns % self.summary_every == 0
+        if show:
+            self.print_summary()
+
+    def summary(self):
+        """Retorna {etapa: {"n", "p50", "p95"}} com as durações em segundos."""
+        with self._lock:
+            data = {name: sorted(values) for name, values in self._durations.items()}
+        result = {}
+        for name, values in data.items():
+            if values:
+                result[name] = {"n": len(values),
+                                "p50": values[int(0.50 * (len(values) - 1))],
+                                "p95": values[int(0.95 * (len(values) - 1))]}
+        return result
+
+    def print_summary(self):
+        print(f"Latências após {self.turns} conversas (s):")
+        for name, stats in sorted(self.summary().items()):
+            print(f"  {name:<20} n={stats['n']:<4} p50={stats['p50']:.3f} p95={stats['p95']:.3f}")
+
+class TTSCache:
+    """Cache em disco dos áudios sintetizados, endereçado pelo conteúdo.
+
+    A chave é (mecanismo, texto, idioma, lento): os arquivos são nomeados
+    pelo hash dela, então a mesma frase sempre cai no mesmo arquivo e
+    sobrevive a reinícios do programa. A data de modificação marca o
+    último uso e serve para a remoção LRU quando o tamanho total passa de
+    max_bytes.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, text, lang, slow, engine, fmt):
+        key = f"{engine}\0{lang}\0{int(bool(slow))}\0{text}".encode("utf-8")
+        return os.path.join(self.directory, f"{hashlib.sha256(key).hexdigest()}.{fmt}")
+
+    def get(self, text, lang, slow, engine="gtts", fmt="mp3"):
+        """Retorna o caminho do áudio em cache ou None se não existir."""
+        path = self._path(text, lang, slow, engine, fmt)
+        try:
+            # Marca como usado recentemente
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def put(self, text, lang, slow, data, engine="gtts", fmt="mp3"):
+        """Guarda o áudio e retorna o caminho do arquivo em cache."""
+        path = self._path(text, lang, slow, engine, fmt)
+        # Grava em arquivo temporário e renomeia, para nunca expor um áudio incompleto
+        temp_file = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(temp_file, "wb") as f:
+                f.write(data)
+            os.replace(temp_file, path)
+        finally:
+            if os.path.exists(temp_file):
+                try:
+                    os.remove(temp_file)
+                except OSError:
+                    pass
+
+        self.evict()
+        return path
+
+    def evict(self):
+        """Remove os áudios usados há mais tempo até o cache caber em max_bytes."""
+        with self._lock:
+            entries = []
+            total = 0
+            for name in os.listdir(self.directory):
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass  # Pode estar em uso pelo pygame (Windows)
+
+class GTTSEngine:
+    """Síntese pelo Google (gTTS): boa voz, mas precisa de internet."""
+
+    name = "gtts"
+    fmt = "mp3"
+    # Áudio da rede é lento para gerar, então vale guardar em disco
+    cacheable = True
+
+    def __init__(self, timeout=TTS_NETWORK_TIMEOUT):
+        self.timeout = timeout
+
+    def synthesize(self, text, lang='pt', slow=False):
+        """Retorna os bytes do áudio mp3, gerados direto em memória."""
+        audio_fp = io.BytesIO()
+        gTTS = importar("gtts").gTTS
+        gTTS(text=text, lang=lang, slow=slow, timeout=self.timeout).write_to_fp(audio_fp)
+        return audio_fp.getvalue()
+
+class EspeakEngine:
+    """Síntese local na CPU com o espeak-ng: funciona sem internet e responde rápido."""
+
+    name = "espeak"
+    fmt = "wav"
+    cacheable = False
+
+    def __init__(self, voice=ESPEAK_VOICE, speed=ESPEAK_SPEED):
+        self.voice = voice
+        self.speed = speed
+        self.executable = shutil.which("espeak-ng") or shutil.which("espeak")
+
+    def synthesize(self, text, lang='pt', slow=False):
+        """Retorna os bytes do áudio wav, lidos da saída padrão do espeak-ng (sem arquivos)."""
+        if not self.executable:
+            raise RuntimeError("espeak-ng não encontrado no sistema")
+        speed = int(self.speed * 0.75) if slow else self.speed
+        result = subprocess.run([self.executable, "-v", self.voice, "-s", str(speed), "--stdout", text],
+                                capture_output=True, timeout=10, check=True)
+        return result.stdout
+
+TTS_ENGINES = {"gtts": GTTSEngine, "espeak": EspeakEngine}
+
+class TTSService:
+    """Escolhe o mecanismo de síntese, usa o cache e troca para o reserva em caso de falha.
+
+    synthesize() retorna o caminho de um arquivo em cache ou um par
+    (bytes, formato) com o áudio em memória; audio_output.play() aceita os dois.
+    """
+
+    def __init__(self, engine, fallback=None, cache=None, cooldown=TTS_FALLBACK_COOLDOWN):
+        self.engine = engine
+        self.fallback = fallback
+        self.cache = cache
+        self.cooldown = cooldown
+        self._engine_failed_at = None
+
+    def synthesize(self, text, lang='pt', slow=False):
+        engines = [self.engine] + ([self.fallback] if self.fallback else [])
+        # Mecanismo principal que falhou há pouco não sintetiza, para não pagar
+        # o timeout de novo; o cache dele continua valendo
+        degraded = self.degraded
+
+        error = None
+        for engine in engines:
+            if engine.cacheable and self.cache:
+                path = self.cache.get(text, lang, slow, engine.name, engine.fmt)
+                if path:
+                    return path
+            if degraded and engine is self.engine:
+                continue
+            try:
+                data = engine.synthesize(text, lang=lang, slow=slow)
+            except Exception as e:
+                print(f"Erro de TTS ({engine.name}): {e}")
+                if engine is self.engine:
+                    self._engine_failed_at = time.monotonic()
+                error = e
+                continue
+            if engine is self.engine:
+                self._engine_failed_at = None
+            if engine.cacheable and self.cache:
+                return self.cache.put(text, lang, slow, data, engine.name, engine.fmt)
+            return (data, engine.fmt)
+        raise error
+
+    @property
+    def degraded(self):
+        """True enquanto o mecanismo principal está desativado por uma falha recente."""
+        return (self.fallback is not None and self._engine_failed_at is not None
+                and time.monotonic() - self._engine_failed_at < self.cooldown)
+
+def criar_tts(engine=TTS_ENGINE, fallback=TTS_FALLBACK_ENGINE):
+    """Cria o serviço de síntese com os mecanismos escolhidos na configuração."""
+    fallback_engine = TTS_ENGINES[fallback]() if fallback and fallback != engine else None
+    return TTSService(TTS_ENGINES[engine](), fallback_engine, TTSCache(TTS_CACHE_DIR, TTS_CACHE_MAX_BYTES))
+
+class PygameAudioOutput:
+    """Saída de áudio pelo mixer do pygame, sem arquivos temporários.
+
+    Cada áudio é decodificado em memória para um pygame.mixer.Sound (PCM)
+    e a fala toca sempre no mesmo canal, reservado para ela. Os sons de
+    aviso (bipe de escuta, erro) são carregados uma vez em start() e cada
+    um tem o seu canal, então se misturam à fala em vez de cortá-la.
+    O fim de cada fala chega pelo evento de fim do canal, lido em uma
+    thread própria, e é sinalizado em self.finished.
+    """
+
+    def __init__(self, effects=(LISTEN_CHIME_PATH, ERROR_SOUND_PATH), pcm_cache_items=AUDIO_PCM_CACHE_ITEMS):
+        self.finished = Event()
+        self.finished.set()  # Inicialmente não está reproduzindo áudio
+        self.effect_paths = effects
+        # Sons de aviso já decodificados: caminho -> (Sound, canal)
+        self.effects = {}
+        # Falas já decodificadas, por caminho no cache de TTS (LRU)
+        self.pcm_cache_items = pcm_cache_items
+        self._pcm_cache = OrderedDict()
+        self._lock = Lock()
+        # Módulo pygame, importado em start()
+        self.pygame = None
+        self.speech_channel = None
+        # Instantes (monotônicos) em que a fala e os avisos em reprodução terminam
+        self._speech_ends_at = 0.0
+        self._effect_ends_at = 0.0
+        # Sinalizado quando o mixer está pronto (fim de start())
+        self.ready = Event()
+
+    def start(self):
+        """Importa o pygame, inicializa o mixer, carrega os avisos e inicia a thread de eventos."""
+        pygame = importar("pygame")
+        # Evento enviado pelo pygame quando o canal da fala termina de tocar
+        self.end_event = pygame.USEREVENT + 1
+        pygame.mixer.init()
+        # Canal 0 para a fala e um para cada aviso, fora da escolha automática do pygame
+        reserved = 1 + len(self.effect_paths)
+        pygame.mixer.set_num_channels(max(pygame.mixer.get_num_channels(), reserved))
+        pygame.mixer.set_reserved(reserved)
+        self.speech_channel = pygame.mixer.Channel(0)
+        self.pygame = pygame
+        for path in self.effect_paths:
+            try:
+                self._effect(path)
+            except Exception as e:
+                print(f"Erro ao carregar som {path}: {e}")
+        Thread(target=self._monitor_events, daemon=True).start()
+        self.ready.set()
+
+    def _monitor_events(self):
+        # O sistema de eventos do pygame exige o subsistema de vídeo; o driver
+        # "dummy" o inicializa sem abrir janela. Os eventos precisam ser lidos
+        # na mesma thread que inicializou o vídeo.
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        pygame = self.pygame
+        try:
+            pygame.display.init()
+            self.speech_channel.set_endevent(self.end_event)
+        except Exception as e:
+            print(f"Erro ao iniciar eventos de áudio do pygame: {e}")
+            return
+        
+        while True:
+            event = pygame.event.wait()
+            # Um play() interrompendo a fala anterior também gera o evento; só
+            # conta como fim se nada estiver tocando
+            if event.type == self.end_event and not self.speech_channel.get_busy():
+                self.finished.set()
+
+    def _decode(self, audio):
+        """Converte um áudio do TTSService em Sound, reaproveitando os já decodificados."""
+        if isinstance(audio, self.pygame.mixer.Sound):
+            return audio
+        if isinstance(audio, tuple):
+            # Áudio só em memória (mecanismo sem cache): decodifica direto dos bytes
+            data, fmt = audio
+            return self.pygame.mixer.Sound(file=io.BytesIO(data))
+        with self._lock:
+            sound = self._pcm_cache.get(audio)
+            if sound is not None:
+                self._pcm_cache.move_to_end(audio)
+                return sound
+        sound = self.pygame.mixer.Sound(audio)
+        with self._lock:
+            self._pcm_cache[audio] = sound
+            while len(self._pcm_cache) > self.pcm_cache_items:
+                self._pcm_cache.popitem(last=False)
+        return sound
+
+    def _effect(self, sound_path):
+        """Retorna (Sound, canal) do aviso, carregando-o na primeira vez."""
+        sound_path = os.path.abspath(sound_path)
+        with self._lock:
+            effect = self.effects.get(sound_path)
+            if effect is None:
+                pygame = self.pygame
+                channel_id = 1 + len(self.effects)
+                if channel_id >= pygame.mixer.get_num_channels():
+                    pygame.mixer.set_num_channels(channel_id + 1)
+                    pygame.mixer.set_reserved(channel_id + 1)
+                effect = (pygame.mixer.Sound(sound_path), pygame.mixer.Channel(channel_id))
+                self.effects[sound_path] = effect
+            return effect
+
+    def play(self, audio):
+        """Toca um áudio do TTSService: caminho de arquivo ou (bytes, formato) em memória."""
+        # Reseta o evento (indica que o áudio está em reprodução)
+        self.finished.clear()
+        try:
+            if self.pygame is None:
+                raise RuntimeError("saída de áudio ainda não iniciada")
+            sound = self._decode(audio)
+            self.speech_channel.play(sound)
+            self._speech_ends_at = time.monotonic() + sound.get_length()
+        except Exception:
+            self.finished.set()  # Garante que o evento seja definido mesmo em caso de erro
+            raise
+
+    def wait(self):
+        """Bloqueia até o fim da reprodução atual, sem consultar o pygame a cada instante."""
+        while not self.finished.wait(timeout=1.0):
+            # Segurança caso o evento de fim se perca
+            if not self.speech_channel.get_busy():
+                self.finished.set()
+
+    def play_effect(self, sound_path):
+        """Toca um som curto de aviso no canal dele, sem esperar o fim nem cortar a fala."""
+        if self.pygame is None:
+            raise RuntimeError("saída de áudio ainda não iniciada")
+        sound, channel = self._effect(sound_path)
+        channel.play(sound)
+        self._effect_ends_at = max(self._effect_ends_at, time.monotonic() + sound.get_length())
+
+    def ends_at(self):
+        """Instante (time.monotonic) em que termina tudo o que está tocando: fala e avisos."""
+        return max(self._speech_ends_at, self._effect_ends_at)
+
+    def pcm_format(self):
+        """Retorna (taxa de amostragem, canais) do mixer, formato de decode_pcm()."""
+        if self.pygame is None:
+            raise RuntimeError("saída de áudio ainda não iniciada")
+        frequency, _, channels = self.pygame.mixer.get_init()
+        return frequency, channels
+
+    def decode_pcm(self, audio):
+        """Decodifica um áudio do TTSService em um array (amostras, canais) no formato do mixer."""
+        if self.pygame is None:
+            raise RuntimeError("saída de áudio ainda não iniciada")
+        pcm = importar("pygame.sndarray").array(self._decode(audio))
+        return pcm.reshape(len(pcm), -1)
+
+    def sound_from_pcm(self, pcm):
+        """Cria um Sound pronto para play() a partir de um array de decode_pcm()."""
+        if pcm.shape[1] == 1:
+            pcm = pcm[:, 0]
+        return importar("pygame.sndarray").make_sound(np.ascontiguousarray(pcm))
+
+    def stop(self):
+        """Interrompe a fala atual e libera quem está em wait()."""
+        if self.speech_channel is not None:
+            self.speech_channel.stop()
+        self._speech_ends_at = min(self._speech_ends_at, time.monotonic())
+        self.finished.set()
+
+def aparar_silencio(pcm, sample_rate, limiar=SAUDACAO_LIMIAR_SILENCIO, margem=SAUDACAO_MARGEM):
+    """Remove o silêncio do início e do fim de um array PCM inteiro com sinal (amostras, canais)."""
+    som = np.flatnonzero(np.abs(pcm.astype(np.int32)).max(axis=1) > limiar * np.iinfo(pcm.dtype).max)
+    if len(som) == 0:
+        return pcm[:0]
+    folga = int(margem * sample_rate)
+    return pcm[max(0, som[0] - folga):som[-1] + 1 + folga]
+
+class GreetingPack:
+    """Pacote em disco com as saudações já montadas, uma por patrocinador.
+
+    Todos os clipes ficam em um único array PCM (saudacoes.npy), aberto
+    como arquivo mapeado em memória; saudacoes.json é o índice, com o
+    trecho [início, fim) de cada patrocinador. A versão (hash das frases,
+    do mecanismo de voz e do formato do mixer) invalida o pacote quando
+    algo muda.
+    """
+
+    def __init__(self, directory=SAUDACOES_DIR):
+        self.directory = directory
+        self.data_path = os.path.join(directory, "saudacoes.npy")
+        self.index_path = os.path.join(directory, "saudacoes.json")
+
+    def load(self, version):
+        """Retorna {id do patrocinador: array PCM} ou None se o pacote faltar ou estiver desatualizado."""
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("versao") != version:
+                return None
+            data = np.load(self.data_path, mmap_mode='r')
+        except (OSError, ValueError) as e:
+            if os.path.exists(self.index_path):
+                print(f"Erro ao ler o pacote de saudações: {e}")
+            return None
+        if len(data) != index.get("amostras"):
+            return None
+        return {key: data[start:end] for key, (start, end) in index["clipes"].items()}
+
+    def save(self, version, clips):
+        """Grava {id do patrocinador: array PCM} como um único array mais o índice."""
+        index = {"versao": version, "clipes": {}}
+        start = 0
+        for key, pcm in clips.items():
+            index["clipes"][key] = [start, start + len(pcm)]
+            start += len(pcm)
+        index["amostras"] = start
+        data = np.concatenate(list(clips.values()))
+
+        # Grava em arquivos temporários e renomeia; o índice por último
+        os.makedirs(self.directory, exist_ok=True)
+        suffix = uuid.uuid4().hex
+        temp_data = f"{self.data_path}.{suffix}.tmp.npy"
+        temp_index = f"{self.index_path}.{suffix}.tmp"
+        try:
+            np.save(temp_data, data)
+            with open(temp_index, "w", encoding="utf-8") as f:
+                json.dump(index, f, ensure_ascii=False)
+            os.replace(temp_data, self.data_path)
+            os.replace(temp_index, self.index_path)
+        finally:
+            for path in (temp_data, temp_index):
+                if os.path.exists(path):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+def carregar_patrocinadores(path=PATROCINADORES_PATH):
+    """Lê os patrocinadores do arquivo de configuração.
+
+    Itens inválidos ou com id repetido são ignorados com um aviso. Sem o
+    arquivo, retorna uma lista vazia e a saudação segue sem patrocinador.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            items = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Erro ao ler os patrocinadores de {path}: {e}")
+        return []
+
+    sponsors = []
+    for item in items:
+        try:
+            sponsor = {"id": str(item["id"]), "frase": str(item["frase"]), "peso": int(item.get("peso", 1))}
+        except (KeyError, TypeError, ValueError, AttributeError):
+            print(f"Patrocinador inválido ignorado: {item!r}")
+            continue
+        if any(s["id"] == sponsor["id"] for s in sponsors):
+            print(f"Patrocinador repetido ignorado: {sponsor['id']}")
+            continue
+        sponsors.append(sponsor)
+    return sponsors
+
+class SponsorRotation:
+    """Rodízio ponderado e justo dos patrocinadores, com as exibições salvas em disco.
+
+    Cada rodada é um baralho em que cada patrocinador aparece peso vezes.
+    As cartas são distribuídas sempre a quem mais falta tocar na rodada,
+    exceto o que acabou de tocar (empates sorteados): as vezes de quem tem
+    peso maior ficam espalhadas pela rodada e ninguém toca duas vezes
+    seguidas quando isso é evitável. Com pesos iguais, todos tocam uma vez
+    antes de qualquer repetição. next() só tira o topo do baralho (O(1)),
+    que é montado uma vez por rodada.
+    Com state_path=None nada é lido nem gravado (benchmark).
+    """
+
+    def __init__(self, sponsors, state_path=PATROCINADORES_ESTADO_PATH, rng=None):
+        self.sponsors = [sponsor for sponsor in sponsors if sponsor["peso"] > 0]
+        self._by_id = {sponsor["id"]: sponsor for sponsor in self.sponsors}
+        self.state_path = state_path
+        self._rng = rng or random.Random()
+        self._lock = Lock()
+        self.impressions = {sponsor["id"]: 0 for sponsor in self.sponsors}
+        # Ids ainda não tocados nesta rodada; o próximo fica no fim da lista
+        self._deck = []
+        self._last = None
+        self._load_state()
+
+    def next(self):
+        """Retorna o próximo patrocinador ({"id", "frase", "peso"}) e conta a exibição, ou None."""
+        with self._lock:
+            if not self.sponsors:
+                return None
+            if not self._deck:
+                self._deal()
+            sponsor_id = self._deck.pop()
+            self._last = sponsor_id
+            self.impressions[sponsor_id] += 1
+            self._save_state()
+            return self._by_id[sponsor_id]
+
+    def _deal(self):
+        remaining = {sponsor["id"]: sponsor["peso"] for sponsor in self.sponsors}
+        deck = []
+        # Começa pelo último da rodada anterior para também não repetir na emenda
+        last = self._last
+        while remaining:
+            # Só repete o anterior se ele for o único que falta
+            choices = [sponsor_id for sponsor_id in remaining if sponsor_id != last] or list(remaining)
+            most = max(remaining[sponsor_id] for sponsor_id in choices)
+            last = self._rng.choice([sponsor_id for sponsor_id in choices if remaining[sponsor_id] == most])
+            deck.append(last)
+            remaining[last] -= 1
+            if not remaining[last]:
+                del remaining[last]
+        self._deck = deck[::-1]
+
+    def _load_state(self):
+        if not self.state_path:
+            return
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Erro ao ler o estado dos patrocinadores: {e}")
+            return
+        for sponsor_id, count in state.get("exibicoes", {}).items():
+            if sponsor_id in self.impressions:
+                self.impressions[sponsor_id] = int(count)
+        self._deck = [sponsor_id for sponsor_id in state.get("baralho", []) if sponsor_id in self._by_id]
+        self._last = state.get("ultimo")
+
+    def _save_state(self):
+        if not self.state_path:
+            return
+        state = {"exibicoes": self.impressions, "baralho": self._deck, "ultimo": self._last}
+        # Grava em arquivo temporário e renomeia, para nunca deixar um estado pela metade
+        temp_file = f"{self.state_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(temp_file, "w", encoding="utf-8") as f:
+                json.dump(state, f, ensure_ascii=False)
+            os.replace(temp_file, self.state_path)
+        except OSError as e:
+            print(f"Erro ao gravar o estado dos patrocinadores: {e}")
+            try:
+                os.remove(temp_file)
+            except OSError:
+                pass
+
+class LLMClient:
+    """Cliente do servidor LLM local (API compatível com OpenAI).
+
+    Mantém uma requests.Session com pool de conexões keep-alive, então as
+    perguntas seguintes reaproveitam a conexão TCP já aberta. Todas as
+    requisições usam os timeouts de conexão e de leitura configurados.
+    """
+
+    def __init__(self, url=LLM_URL, model=LLM_MODEL, system_prompt=LLM_SYSTEM_PROMPT,
+                 connect_timeout=LLM_CONNECT_TIMEOUT, read_timeout=LLM_READ_TIMEOUT, pool_size=4,
+                 tracer=None):
+        self.url = url
+        self.model = model
+        self.system_prompt = system_prompt
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = importar("requests").Session()
+        adapter = importar("requests.adapters").HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+        # Erro da última consulta (None se a resposta veio completa do servidor)
+        self.last_error = None
+        # Instante (monotônico) da última resposta recebida do servidor
+        self.last_used = None
+        # Texto da última resposta exatamente como veio do servidor
+        self.last_answer = None
+        # Medição onde o pedido e o primeiro token são marcados
+        self.tracer = tracer or LatencyTracer(path=None)
+
+    def payload(self, question, stream=False, max_tokens=50, history=()):
+        """Monta o corpo da requisição para o servidor local LLM.
+
+        history são as mensagens anteriores da sessão, entre o prompt de
+        sistema e a pergunta atual.
+        """
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": self.system_prompt},
+                *history,
+                {"role": "user", "content": question}
+            ],
+            "temperature": 0.7,
+            "max_tokens": max_tokens,
+            "stream": stream
+        }
+
+    def ask(self, question, history=()):
+        """Consulta o servidor local LLM e retorna a resposta."""
+        self.last_error = None
+        self.last_answer = None
+        try:
+            self.tracer.mark("llm_request")
+            with self.tracer.span("llm"):
+                response = self.session.post(self.url, json=self.payload(question, history=history),
+                                             timeout=self.timeout)
+            if response.status_code == 200:
+                self.last_used = time.monotonic()
+                self.last_answer = response.json()["choices"][0]["message"]["content"]
+                return self.last_answer.strip()
+            else:
+                self.last_error = f"HTTP {response.status_code}"
+                return "Erro ao obter resposta do servidor local."
+        except Exception as e:
+            self.last_error = str(e)
+            print("Erro ao se comunicar com o servidor local:", e)
+            return "Desculpe, não consegui obter uma resposta no momento."
+
+    def ask_stream(self, question, history=()):
+        """Consulta o servidor local LLM em modo streaming (SSE) e gera a resposta frase a frase."""
+        yielded = False
+        self.last_error = None
+        self.last_answer = None
+        turn = self.tracer.current
+        started = turn.now() if turn else 0.0
+        response = None
+        try:
+            self.tracer.mark("llm_request")
+            headers = {"Accept": "text/event-stream"}
+            response = self.session.post(self.url, json=self.payload(question, stream=True, history=history),
+                                         headers=headers, stream=True, timeout=self.timeout)
+            if response.status_code != 200:
+                self.last_error = f"HTTP {response.status_code}"
+                yield "Erro ao obter resposta do servidor local."
+                return
+            self.last_used = time.monotonic()
+
+            buffer = ""
+            texto = ""
+            for raw_line in response.iter_lines():
+                # Cada evento SSE vem como "data: {json}"; linhas vazias separam eventos
+                line = raw_line.decode('utf-8', errors='replace').strip()
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+
+                delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                if not delta:
+                    continue
+                self.tracer.mark("llm_first_token")
+                buffer += delta
+                texto += delta
+
+                # Entrega todas as frases completas e mantém o resto no buffer
+                partes = FIM_DE_FRASE.split(buffer)
+                for frase in partes[:-1]:
+                    if frase.strip():
+                        yielded = True
+                        yield frase.strip()
+                buffer = partes[-1]
+
+            self.last_answer = texto
+            if buffer.strip():
+                yielded = True
+                yield buffer.strip()
+        except Exception as e:
+            self.last_error = str(e)
+            print("Erro ao se comunicar com o servidor local:", e)
+            if not yielded:
+                yield "Desculpe, não consegui obter uma resposta no momento."
+        finally:
+            # Se a conversa for cancelada no meio, a conexão é liberada aqui
+            if response is not None:
+                response.close()
+            if turn:
+                turn.add_span("llm", started, turn.now())
+
+    def warm_up(self):
+        """Envia uma requisição mínima para o servidor carregar o modelo e abrir a conexão.
+
+        Retorna o tempo gasto em segundos, ou None se o servidor não respondeu.
+        """
+        start = time.monotonic()
+        try:
+            response = self.session.post(self.url, json=self.payload("Olá", max_tokens=1), timeout=self.timeout)
+            response.raise_for_status()
+        except Exception as e:
+            print(f"Aquecimento do LLM falhou: {e}")
+            return None
+        self.last_used = time.monotonic()
+        elapsed = time.monotonic() - start
+        print(f"LLM aquecido em {elapsed:.2f}s")
+        return elapsed
+
+def dividir_frases(texto):
+    """Divide um texto nas mesmas frases em que o streaming do LLM o corta."""
+    return [frase.strip() for frase in FIM_DE_FRASE.split(texto) if frase.strip()]
+
+def normalizar_pergunta(texto):
+    """Remove acentos, pontuação e diferenças de maiúsculas/espaços de uma pergunta."""
+    texto = unicodedata.normalize("NFKD", texto)
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    texto = re.sub(r"[^\w\s]", " ", texto.lower())
+    return " ".join(texto.split())
+
+class AnswerCache:
+    """Cache das respostas do LLM para perguntas repetidas dos visitantes.
+
+    A busca tenta, nesta ordem: a pergunta exatamente igual, a pergunta
+    normalizada (sem acentos, pontuação e maiúsculas) e, se
+    similarity_threshold não for None, a pergunta mais parecida por
+    similaridade de cosseno TF-IDF entre as palavras. Entradas expiram
+    após ttl segundos e as mais antigas saem quando o cache enche.
+    """
+
+    def __init__(self, ttl=ANSWER_CACHE_TTL, similarity_threshold=ANSWER_CACHE_SIMILARITY,
+                 max_entries=ANSWER_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        # pergunta normalizada -> (resposta, instante em que foi guardada)
+        self._entries = OrderedDict()
+        # pergunta original -> pergunta normalizada
+        self._exact = {}
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, question):
+        """Retorna a resposta guardada para a pergunta (ou uma parecida), ou None."""
+        with self._lock:
+            self._expire()
+            key = self._exact.get(question)
+            if key is None:
+                key = normalizar_pergunta(question)
+                if key not in self._entries and self.similarity_threshold is not None:
+                    key = self._most_similar(key)
+            if key is None or key not in self._entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self._entries[key][0]
+
+    def put(self, question, answer):
+        with self._lock:
+            key = normalizar_pergunta(question)
+            if not key:
+                return
+            self._entries.pop(key, None)
+            self._entries[key] = (answer, time.monotonic())
+            self._exact[question] = key
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._exact = {q: k for q, k in self._exact.items() if k in self._entries}
+
+    def _expire(self):
+        limit = time.monotonic() - self.ttl
+        expired = [key for key, (_, stored) in self._entries.items() if stored < limit]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._exact = {q: k for q, k in self._exact.items() if k in self._entries}
+
+    def _most_similar(self, key):
+        """Pergunta guardada mais parecida com key, se passar do limiar de similaridade."""
+        if not self._entries:
+            return None
+        docs = {stored: stored.split() for stored in self._entries}
+        words = key.split()
+
+        # Frequência de documentos, contando a própria pergunta buscada
+        df = {}
+        for tokens in list(docs.values()) + [words]:
+            for word in set(tokens):
+                df[word] = df.get(word, 0) + 1
+        n_docs = len(docs) + 1
+
+        def vector(tokens):
+            vec = {}
+            for word in tokens:
+                vec[word] = vec.get(word, 0) + 1
+            for word in vec:
+                vec[word] *= math.log((1 + n_docs) / (1 + df[word])) + 1
+            norm = math.sqrt(sum(v * v for v in vec.values()))
+            return vec, norm
+
+        query, query_norm = vector(words)
+        if not query_norm:
+            return None
+
+        best_key, best_score = None, 0.0
+        for stored, tokens in docs.items():
+            vec, norm = vector(tokens)
+            if not norm:
+                continue
+            score = sum(w * vec.get(word, 0) for word, w in query.items()) / (query_norm * norm)
+            if score > best_score:
+                best_key, best_score = stored, score
+        return best_key if best_score >= self.similarity_threshold else None
+
+class ConversationHistory:
+    """Perguntas e respostas de uma sessão, limitadas a um orçamento de tokens.
+
+    Os textos são guardados exatamente como foram enviados e recebidos.
+    Com o prompt de sistema fixo, o começo das mensagens se repete byte a
+    byte entre os turnos, e o servidor reaproveita o cache (KV) do prefixo
+    já processado. Quando o orçamento estoura, saem os turnos mais antigos,
+    sempre pergunta e resposta juntas.
+    """
+
+    def __init__(self, max_tokens=LLM_HISTORY_TOKENS):
+        self.max_tokens = max_tokens
+        self.turns = deque()
+
+    @staticmethod
+    def estimate_tokens(text):
+        # Sem o tokenizador do modelo: em português, ~3 caracteres por token
+        return len(text) // 3 + 1
+
+    def tokens(self):
+        return sum(self.estimate_tokens(q) + self.estimate_tokens(a) for q, a in self.turns)
+
+    def add(self, question, answer):
+        self.turns.append((question, answer))
+        while self.turns and self.tokens() > self.max_tokens:
+            self.turns.popleft()
+
+    def messages(self):
+        """Retorna o histórico no formato de mensagens da API de chat."""
+        messages = []
+        for question, answer in self.turns:
+            messages.append({"role": "user", "content": question})
+            messages.append({"role": "assistant", "content": answer})
+        return messages
+
+    def __len__(self):
+        return len(self.turns)
+
+class GoogleRecognizer:
+    """Reconhecimento online pelo serviço do Google (precisa de internet)."""
+
+    name = "google"
+    streaming = False
+
+    def __init__(self, language=STT_LANGUAGE):
+        self.language = language
+        self.recognizer = importar("speech_recognition").Recognizer()
+
+    def load(self):
+        pass
+
+    def transcribe(self, audio):
+        """Converte um sr.AudioData em texto; erros seguem os de speech_recognition."""
+        return self.recognizer.recognize_google(audio, language=self.language)
+
+class VoskRecognizer:
+    """Reconhecimento local na CPU com o Vosk, com resultados parciais em streaming.
+
+    Uso em streaming: start(), accept() a cada trecho PCM capturado
+    (retorna o texto parcial até ali) e finish() para o texto final.
+    """
+
+    name = "vosk"
+    streaming = True
+    SAMPLE_RATE = 16000
+
+    def __init__(self, model_path=VOSK_MODEL_PATH):
+        self.model_path = model_path
+        self.model = None
+        self._recognizer = None
+        self._text = []
+        self._lock = Lock()
+
+    def load(self):
+        """Carrega o modelo (alguns segundos); seguro para chamar de várias threads."""
+        with self._lock:
+            if self.model is None:
+                vosk = importar("vosk")
+                vosk.SetLogLevel(-1)
+                self.model = vosk.Model(self.model_path)
+
+    def start(self):
+        self.load()
+        self._recognizer = importar("vosk").KaldiRecognizer(self.model, self.SAMPLE_RATE)
+        self._text = []
+
+    def accept(self, pcm):
+        """Processa um trecho PCM 16 kHz/16 bits e retorna a transcrição parcial acumulada."""
+        if self._recognizer.AcceptWaveform(pcm):
+            # Fim de um segmento: o texto dele já é definitivo
+            self._add(json.loads(self._recognizer.Result()).get("text", ""))
+            partial = ""
+        else:
+            partial = json.loads(self._recognizer.PartialResult()).get("partial", "")
+        return " ".join(self._text + ([partial] if partial else []))
+
+    def finish(self):
+        """Encerra o reconhecimento e retorna o texto final."""
+        self._add(json.loads(self._recognizer.FinalResult()).get("text", ""))
+        text = " ".join(self._text)
+        self._recognizer = None
+        if not text:
+            raise importar("speech_recognition").UnknownValueError()
+        return text
+
+    def transcribe(self, audio):
+        self.start()
+        self.accept(audio.get_raw_data(convert_rate=self.SAMPLE_RATE, convert_width=2))
+        return self.finish()
+
+    def _add(self, text):
+        if text:
+            self._text.append(text)
+
+def criar_reconhecedor(engine=STT_ENGINE):
+    """Cria o mecanismo de reconhecimento de fala escolhido na configuração."""
+    if engine == "vosk":
+        if not VOSK_AVAILABLE:
+            print("Módulo vosk não encontrado. Instale com 'pip install vosk'. Usando o Google.")
+        elif not os.path.isdir(VOSK_MODEL_PATH):
+            print(f"Modelo Vosk não encontrado em {VOSK_MODEL_PATH}. Usando o Google.")
+        else:
+            return VoskRecognizer(VOSK_MODEL_PATH)
+    return GoogleRecognizer(STT_LANGUAGE)
+
+class VoiceActivityDetector:
+    """Detecta início e fim de fala por energia e cruzamentos por zero em quadros NumPy.
+
+    O ruído ambiente é calibrado uma vez e depois acompanhado nos quadros
+    sem fala, persistindo entre os turnos. Assim o limiar se ajusta ao
+    barulho do salão sem recalibrar a cada visitante. O fim da fala é
+    decidido após end_silence segundos de silêncio ou max_phrase segundos
+    de captura, então a espera até o reconhecimento é sempre limitada.
+    """
+
+    def __init__(self, sample_rate=VAD_SAMPLE_RATE, frame_ms=VAD_FRAME_MS,
+                 end_silence=VAD_END_SILENCE, max_phrase=VAD_MAX_PHRASE,
+                 start_timeout=VAD_START_TIMEOUT, min_speech=VAD_MIN_SPEECH,
+                 pre_speech=VAD_PRE_SPEECH, energy_ratio=VAD_ENERGY_RATIO):
+        self.sample_rate = sample_rate
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.frame_seconds = frame_ms / 1000
+        self.end_silence = end_silence
+        self.max_phrase = max_phrase
+        self.start_timeout = start_timeout
+        self.min_speech = min_speech
+        self.pre_speech = pre_speech
+        self.energy_ratio = energy_ratio
+        # RMS do ruído ambiente (None até a calibração)
+        self.noise_floor = None
+        # Silêncio (s) esperado no último fim de fala detectado
+        self.last_endpoint_delay = None
+
+    @staticmethod
+    def features(frame):
+        """Retorna (energia RMS, taxa de cruzamentos por zero) de um quadro PCM 16 bits."""
+        samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32)
+        if not len(samples):
+            return 0.0, 0.0
+        rms = float(np.sqrt(np.mean(samples * samples)))
+        zcr = float(np.mean(np.signbit(samples[1:]) != np.signbit(samples[:-1]))) if len(samples) > 1 else 0.0
+        return rms, zcr
+
+    def calibrate(self, frames):
+        """Define o nível de ruído ambiente a partir de quadros sem fala."""
+        levels = [self.features(frame)[0] for frame in frames]
+        if levels:
+            self.noise_floor = float(np.median(levels))
+
+    def is_speech(self, frame):
+        rms, zcr = self.features(frame)
+        if self.noise_floor is None:
+            self.noise_floor = rms
+            return False
+        speech = rms > max(self.noise_floor * self.energy_ratio, VAD_MIN_RMS) and zcr < VAD_MAX_ZCR
+        if not speech:
+            # Acompanha lentamente as mudanças do ruído ambiente
+            self.noise_floor = 0.95 * self.noise_floor + 0.05 * rms
+        return speech
+
+    def is_barge_in(self, frame, energy_ratio=BARGE_IN_ENERGY_RATIO):
+        """Como is_speech, mas com limiar mais alto e sem atualizar o ruído ambiente.
+
+        Usado enquanto o assistente fala: o eco do alto-falante não pode
+        contar como voz nem ser aprendido como ruído do salão.
+        """
+        if self.noise_floor is None:
+            return False
+        rms, zcr = self.features(frame)
+        return rms > max(self.noise_floor * energy_ratio, VAD_MIN_RMS) and zcr < VAD_MAX_ZCR
+
+    def capture(self, read_frame, on_audio=None, start_timeout=None):
+        """Lê quadros com read_frame() até o fim da fala e retorna o PCM da frase.
+
+        on_audio(quadro) recebe cada quadro da frase assim que é aceito, para
+        reconhecimento em streaming. Retorna None se ninguém começou a falar
+        dentro de start_timeout (padrão: o do detector).
+        """
+        pre_frames = deque(maxlen=max(1, int(self.pre_speech / self.frame_seconds)))
+        start_frames = max(1, int(round(self.min_speech / self.frame_seconds)))
+        end_frames = max(1, int(round(self.end_silence / self.frame_seconds)))
+        max_frames = int(self.max_phrase / self.frame_seconds)
+        timeout_frames = int((start_timeout or self.start_timeout) / self.frame_seconds)
+
+        # Aguarda o início da fala
+        voiced = 0
+        waited = 0
+        while True:
+            frame = read_frame()
+            pre_frames.append(frame)
+            waited += 1
+            if self.is_speech(frame):
+                voiced += 1
+                if voiced >= start_frames:
+                    break
+            else:
+                voiced = 0
+                if waited >= timeout_frames:
+                    return None
+
+        phrase = list(pre_frames)
+        if on_audio:
+            for frame in phrase:
+                on_audio(frame)
+
+        # Captura até o silêncio final ou o limite de duração
+        silence = 0
+        while silence < end_frames and len(phrase) < max_frames:
+            frame = read_frame()
+            phrase.append(frame)
+            if on_audio:
+                on_audio(frame)
+            silence = 0 if self.is_speech(frame) else silence + 1
+
+        self.last_endpoint_delay = silence * self.frame_seconds
+        return b"".join(phrase)
+
+class MicrophoneRing:
+    """Captura contínua do microfone em um buffer circular NumPy de tamanho fixo.
+
+    Uma thread mantém o microfone aberto durante toda a execução e escreve
+    as amostras no buffer. Quem precisa de áudio cria um leitor com
+    frame_reader(), que começa alguns instantes no passado (pre-roll):
+    o custo de abrir o dispositivo sai do caminho crítico e a fala logo
+    após o aviso sonoro não é cortada.
+    """
+
+    def __init__(self, sample_rate=VAD_SAMPLE_RATE, frame_samples=None, seconds=MIC_BUFFER_SECONDS):
+        self.sample_rate = sample_rate
+        self.frame_samples = frame_samples or sample_rate * VAD_FRAME_MS // 1000
+        self.capacity = int(seconds * sample_rate)
+        self.buffer = np.zeros(self.capacity, dtype=np.int16)
+        # Total de amostras já escritas; a posição absoluta de cada amostra
+        self.written = 0
+        self._cond = Condition()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        sr = importar("speech_recognition")
+        backoff = 1.0
+        while True:
+            try:
+                with sr.Microphone(sample_rate=self.sample_rate, chunk_size=self.frame_samples) as source:
+                    backoff = 1.0
+                    while True:
+                        self.write(source.stream.read(self.frame_samples))
+            except Exception as e:
+                print(f"Erro na captura do microfone: {e}. Tentando novamente em {backoff:.0f}s")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    def write(self, data):
+        """Acrescenta amostras PCM 16 bits ao buffer circular."""
+        samples = np.frombuffer(data, dtype=np.int16)[-self.capacity:]
+        with self._cond:
+            start = self.written % self.capacity
+            end = start + len(samples)
+            if end <= self.capacity:
+                self.buffer[start:end] = samples
+            else:
+                split = self.capacity - start
+                self.buffer[start:] = samples[:split]
+                self.buffer[:end - self.capacity] = samples[split:]
+            self.written += len(samples)
+            self._cond.notify_all()
+
+    def read(self, position, count, timeout=MIC_READ_TIMEOUT):
+        """Lê count amostras a partir da posição absoluta; bloqueia até estarem disponíveis.
+
+        Retorna (bytes, próxima posição). Se o leitor ficou para trás mais
+        do que o tamanho do buffer, pula para o áudio mais antigo ainda
+        disponível.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.written >= position + count, timeout=timeout):
+                raise OSError("Microfone sem áudio")
+            position = max(position, self.written - self.capacity)
+            start = position % self.capacity
+            end = start + count
+            if end <= self.capacity:
+                data = self.buffer[start:end].tobytes()
+            else:
+                data = self.buffer[start:].tobytes() + self.buffer[:end - self.capacity].tobytes()
+        return data, position + count
+
+    def frame_reader(self, pre_roll=MIC_PRE_ROLL):
+        """Retorna uma função que lê o próximo quadro, começando pre_roll segundos no passado."""
+        with self._cond:
+            position = max(0, self.written - int(pre_roll * self.sample_rate), self.written - self.capacity)
+        state = {"position": position}
+
+        def read_frame():
+            data, state["position"] = self.read(state["position"], self.frame_samples)
+            return data
+        return read_frame
+
+def _portas_registro_windows():
+    # Portas COM presentes agora, do registro (sem abrir nenhuma)
+    try:
+        import winreg
+        key = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, r"HARDWARE\DEVICEMAP\SERIALCOMM")
+    except (ImportError, OSError):
+        return []
+    ports = []
+    with key:
+        i = 0
+        while True:
+            try:
+                ports.append(winreg.EnumValue(key, i)[1])
+            except OSError:
+                break
+            i += 1
+    return sorted(ports)
+
+def descobrir_portas():
+    """Lista as portas seriais onde o Arduino pode estar, sem abri-las.
+
+    No Linux, os nomes estáveis de /dev/serial/by-id vêm antes de
+    /dev/ttyACM* e /dev/ttyUSB* (a mesma porta não aparece duas vezes);
+    no macOS, /dev/cu.usbmodem* e /dev/cu.usbserial*; no Windows, as
+    portas COM do registro. No Windows e em outros sistemas, se nada for
+    encontrado assim, usa serial.tools.list_ports, quando disponível. No
+    Linux e no macOS não: ele lista também as UARTs da placa (/dev/ttyS*),
+    que abrem sem erro mas nunca são o Arduino.
+    """
+    usb_globs = True
+    if sys.platform.startswith("linux"):
+        found = sorted(glob.glob("/dev/serial/by-id/*"))
+        found += sorted(glob.glob("/dev/ttyACM*")) + sorted(glob.glob("/dev/ttyUSB*"))
+    elif sys.platform == "darwin":
+        found = sorted(glob.glob("/dev/cu.usbmodem*")) + sorted(glob.glob("/dev/cu.usbserial*"))
+    else:
+        usb_globs = False
+        found = _portas_registro_windows() if sys.platform == "win32" else []
+    if not found and not usb_globs and SERIAL_TOOLS_AVAILABLE:
+        found = [port.device for port in serial.tools.list_ports.comports()]
+
+    ports = []
+    seen = set()
+    for port in found:
+        real = os.path.realpath(port)
+        if real not in seen:
+            seen.add(real)
+            ports.append(port)
+    return ports
+
+def ler_ultima_porta(path=SERIAL_LAST_PORT_FILE):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def salvar_ultima_porta(port, path=SERIAL_LAST_PORT_FILE):
+    if port == ler_ultima_porta(path):
+        return
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(port)
+    except OSError as e:
+        print(f"Erro ao salvar a última porta serial: {e}")
+
+def abrir_porta(candidates, baudrate=SERIAL_BAUDRATE, timeout=SERIAL_PROBE_TIMEOUT):
+    """Abre as portas candidatas em paralelo e retorna a primeira, na ordem da lista, que abrir.
+
+    Uma porta travada (comum no Windows) não atrasa as outras: depois de
+    timeout segundos ela é abandonada. As portas abertas que não forem
+    escolhidas são fechadas, mesmo as que abrirem depois. Retorna None se
+    nenhuma abrir.
+    """
+    if not candidates:
+        return None
+    pool = ThreadPoolExecutor(max_workers=len(candidates))
+    futures = [pool.submit(serial.Serial, port, baudrate, timeout=1) for port in candidates]
+    pool.shutdown(wait=False)
+
+    chosen = None
+    deadline = time.monotonic() + timeout
+    for future in futures:
+        try:
+            chosen = future.result(max(0.0, deadline - time.monotonic()))
+            break
+        except Exception:
+            continue
+
+    def close_unused(future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        connection = future.result()
+        if connection is not chosen:
+            connection.close()
+    for future in futures:
+        future.add_done_callback(close_unused)
+    return chosen
+
+class SerialSensorReader:
+    """Leitor do sensor de presença na porta serial, com reconexão automática.
+
+    Uma única thread lê a porta com leituras bloqueantes, separa as linhas
+    pelo \\n (aceitando \\r\\n e linhas que chegam em pedaços) e entrega
+    cada linha completa a on_line(linha, recebido_em). Se a porta cair,
+    ela é fechada e a thread tenta de novo: a porta configurada, a última
+    que funcionou e as que find_ports() encontrar, todas em paralelo.
+    Enquanto nenhuma porta existir, a busca se repete a cada
+    scan_interval; se existirem mas não abrirem, a espera dobra a cada
+    falha. on_status(texto, erro) recebe as mudanças de estado da conexão.
+    A última porta fica em last_port_file (None não guarda).
+    """
+
+    def __init__(self, on_line, on_status, port=PORTA_COM, baudrate=SERIAL_BAUDRATE,
+                 find_ports=descobrir_portas, scan_interval=SERIAL_SCAN_INTERVAL,
+                 last_port_file=SERIAL_LAST_PORT_FILE,
+                 reconnect_min=SERIAL_RECONNECT_MIN, reconnect_max=SERIAL_RECONNECT_MAX,
+                 max_line=SERIAL_MAX_LINE):
+        self.on_line = on_line
+        self.find_ports = find_ports
+        self.scan_interval = scan_interval
+        self.last_port_file = last_port_file
+        self.on_status = on_status
+        self.port = port
+        self.baudrate = baudrate
+        self.reconnect_min = reconnect_min
+        self.reconnect_max = reconnect_max
+        self.max_line = max_line
+        self.connection = None
+        self._thread = None
+        self._stop = Event()
+        self._restart = Event()
+
+    def start(self):
+        """Inicia a thread de leitura; chamadas repetidas não criam outra."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def reconnect(self):
+        """Fecha a conexão atual e procura a porta de novo, sem esperar o intervalo."""
+        self._restart.set()
+        self._interrupt()
+        self.start()
+
+    def stop(self):
+        self._stop.set()
+        self._restart.set()
+        self._interrupt()
+
+    def _interrupt(self):
+        # Desbloqueia a leitura em andamento na thread do leitor
+        connection = self.connection
+        if connection is not None and hasattr(connection, "cancel_read"):
+            try:
+                connection.cancel_read()
+            except Exception:
+                pass
+
+    def _connect(self):
+        """Retorna (conexão ou None, portas encontradas pela busca)."""
+        found = self.find_ports()
+        candidates = []
+        last_port = ler_ultima_porta(self.last_port_file) if self.last_port_file else None
+        for port in [self.port, last_port] + found:
+            if port and port not in candidates:
+                candidates.append(port)
+        if os.name == "posix":
+            # Dispositivo que não existe nem precisa ser aberto
+            candidates = [port for port in candidates if os.path.exists(port)]
+        return abrir_porta(candidates, self.baudrate), found
+
+    def _run(self):
+        delay = self.reconnect_min
+        failing = False
+        while not self._stop.is_set():
+            self._restart.clear()
+            connection, found = self._connect()
+            if connection is None:
+                if not failing:
+                    if found:
+                        texto = f"Não foi possível abrir as portas {', '.join(found)}. Verifique as permissões."
+                    else:
+                        texto = "Nenhuma porta serial disponível. Verifique se o Arduino está conectado."
+                    self.on_status(texto + "\nTentando de novo automaticamente...", True)
+                    failing = True
+                if found:
+                    self._restart.wait(delay)
+                    delay = min(delay * 2, self.reconnect_max)
+                else:
+                    # Procurar de novo é barato: a porta é aberta assim que aparecer
+                    self._restart.wait(self.scan_interval)
+                continue
+
+            delay = self.reconnect_min
+            failing = False
+            self.connection = connection
+            self.on_status(f"Conectado à porta {connection.port} com sucesso!\nMonitorando sinais do Arduino...", False)
+            try:
+                self._read_lines(connection)
+            except (serial.SerialException, OSError) as e:
+                if not self._stop.is_set():
+                    self.on_status(f"Conexão com o sensor perdida: {e}\nReconectando...", True)
+            finally:
+                self.connection = None
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+
+    def _read_lines(self, connection):
+        # A porta só é lembrada depois de entregar uma linha: abrir não basta,
+        # outras portas seriais abrem sem erro e nunca enviam nada
+        saved = not self.last_port_file
+        buffer = bytearray()
+        while not self._restart.is_set():
+            # Bloqueia até chegar pelo menos um byte (ou esgotar o timeout da
+            # porta) e depois pega o que já estiver no buffer do sistema
+            data = connection.read(connection.in_waiting or 1)
+            if not data:
+                continue
+            recebido_em = time.monotonic()
+            buffer += data
+            while True:
+                end = buffer.find(b"\n")
+                if end < 0:
+                    break
+                raw = bytes(buffer[:end])
+                del buffer[:end + 1]
+                if len(raw) > self.max_line:
+                    # Lixo (ex.: do boot do Arduino) antes do sinal na mesma linha:
+                    # só o fim da linha é mantido, onde o sinal estaria
+                    print(f"Descartados {len(raw) - self.max_line} bytes do início de uma linha longa da porta serial")
+                    raw = raw[-self.max_line:]
+                line = raw.decode("utf-8", errors="replace").strip()
+                if line:
+                    if not saved:
+                        salvar_ultima_porta(connection.port, self.last_port_file)
+                        saved = True
+                    self.on_line(line, recebido_em)
+            if len(buffer) > self.max_line:
+                # Mantém o fim: pode ser o começo de um sinal ainda chegando
+                print(f"Descartados {len(buffer) - self.max_line} bytes sem fim de linha da porta serial")
+                del buffer[:-self.max_line]
+
+def contem_sinal(line, sinal):
+    """True se sinal aparece na linha como palavra ou no fim dela (após lixo sem espaço)."""
+    return sinal in line.split() or line.endswith(sinal)
+
+class TriggerDispatcher:
+    """Decide o destino de cada gatilho de visitante (sensor ou botão), de qualquer thread.
+
+    Garante uma única conversa ativa. Sinais do sensor em rajada (a menos
+    de coalesce segundos do anterior ou do fim da última conversa) contam
+    como o mesmo visitante. Um visitante novo durante a conversa fica na
+    fila, que tem uma vaga só e expira após pending_ttl segundos.
+
+    Contadores (stats()): cada visitante aceito termina atendido (served),
+    sem resposta (failed, a conversa falhou) ou descartado (dropped:
+    substituído pelo botão ou desistiu da fila), quando não está ativo ou na
+    fila; sempre vale accepted = served + failed + dropped + active +
+    pending. Gatilhos que não viram visitante contam à parte: agrupados ao
+    anterior (coalesced) ou recusados com a fila cheia (rejected).
+    """
+
+    # Decisões de trigger()
+    INICIAR = "iniciar"
+    FILA = "fila"
+    AGRUPADO = "agrupado"
+    DESCARTADO = "descartado"
+
+    def __init__(self, coalesce=SENSOR_COOLDOWN, pending_ttl=VISITANTE_ESPERA_MAX):
+        self.coalesce = coalesce
+        self.pending_ttl = pending_ttl
+        self.active = False
+        # (origem, instante) do visitante na fila, ou None
+        self.pending = None
+        self.accepted = 0
+        self.served = 0
+        self.failed = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.rejected = 0
+        # Sinais do sensor antes deste instante (monotônico) são agrupados
+        self._quiet_until = 0.0
+        self._lock = Lock()
+
+    def trigger(self, origin, at=None, replace=False):
+        """Registra um gatilho e retorna INICIAR, FILA, AGRUPADO ou DESCARTADO.
+
+        Com replace=True (botão manual) a conversa sempre inicia, substituindo
+        a atual, sem passar pelo agrupamento.
+        """
+        at = at if at is not None else time.monotonic()
+        with self._lock:
+            if replace:
+                if self.active:
+                    # A conversa substituída não chega a finished(): conta como descartada
+                    self.dropped += 1
+                self.active = True
+                self.accepted += 1
+                return self.INICIAR
+            coalesced = at < self._quiet_until
+            # A janela desliza: um visitante parado no sensor continua agrupado
+            self._quiet_until = max(self._quiet_until, at + self.coalesce)
+            if coalesced:
+                self.coalesced += 1
+                return self.AGRUPADO
+            if not self.active:
+                self.active = True
+                self.accepted += 1
+                return self.INICIAR
+            if self.pending is not None and at - self.pending[1] <= self.pending_ttl:
+                self.rejected += 1
+                return self.DESCARTADO
+            if self.pending is not None:
+                self.dropped += 1  # O da fila desistiu; a vaga é do novo
+            self.pending = (origin, at)
+            self.accepted += 1
+            return self.FILA
+
+    def finished(self, served=True, now=None):
+        """Encerra a conversa ativa e retorna (origem, instante) do próximo da fila, ou None."""
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            if served:
+                self.served += 1
+            else:
+                self.failed += 1
+            self._quiet_until = max(self._quiet_until, now + self.coalesce)
+            pending, self.pending = self.pending, None
+            if pending is not None and now - pending[1] > self.pending_ttl:
+                self.dropped += 1
+                pending = None
+            self.active = pending is not None
+            return pending
+
+    def discard_pending(self):
+        """Descarta o visitante da fila (ex.: ao encerrar o programa)."""
+        with self._lock:
+            if self.pending is not None:
+                self.pending = None
+                self.dropped += 1
+
+    def stats(self):
+        with self._lock:
+            return {"accepted": self.accepted, "served": self.served, "failed": self.failed,
+                    "dropped": self.dropped, "coalesced": self.coalesced, "rejected": self.rejected,
+                    "pending": self.pending is not None, "active": self.active}
+
+class ConversaCancelada(Exception):
+    """A conversa foi cancelada enquanto uma etapa ainda estava em andamento."""
+
+class AssistenteMotor:
+    """Pipeline de conversa do quiosque, sem interface gráfica.
+
+    Junta o sensor (serial), a escuta (microfone, VAD e reconhecimento), o
+    LLM e a fala (TTS e reprodução). Os componentes podem ser passados no
+    construtor (por exemplo, simulados em medições); os que faltarem são
+    criados a partir da configuração.
+
+    Interfaces acompanham o motor inscrevendo callbacks com on():
+      "status"   (texto)   mensagem para o visitante ou o operador
+      "falando"  (ativo)   True quando a fala começa, False quando termina
+      "escutando" ()       o microfone começou a esperar uma pergunta
+      "conversa" (estado)  "inicio" e "fim" de cada conversa
+    Os callbacks rodam na thread que gerou o evento; uma interface gráfica
+    deve repassá-los para a própria thread.
+
+    Cada conversa é uma tarefa asyncio em um loop próprio, em segundo plano.
+    As etapas bloqueantes (fala, escuta, LLM) rodam em threads do executor,
+    cada uma com seu prazo; cancelar a tarefa interrompe a etapa em curso.
+    """
+
+    def __init__(self, tts_service=None, llm_client=None, stt_backend=None, vad=None,
+                 mic_ring=None, audio_output=None, tracer=None, answer_cache=None,
+                 sensor_cooldown=SENSOR_COOLDOWN, greeting_pack=None, sponsors=None, barge_in=BARGE_IN):
+        self.tracer = tracer or LatencyTracer()
+        self.tts_service = tts_service or criar_tts()
+        self.llm_client = llm_client or LLMClient()
+        # O cliente marca o pedido e o primeiro token na conversa em andamento
+        self.llm_client.tracer = self.tracer
+        self.stt_backend = stt_backend or criar_reconhecedor()
+        # Detector único: a calibração do ruído ambiente vale para todos os turnos
+        self.vad = vad or VoiceActivityDetector()
+        self.mic_ring = mic_ring or MicrophoneRing(frame_samples=self.vad.frame_samples)
+        self.audio_output = audio_output or PygameAudioOutput()
+        self.answer_cache = answer_cache or AnswerCache()
+        self.greeting_pack = greeting_pack or GreetingPack()
+        self.patrocinios = sponsors or SponsorRotation(carregar_patrocinadores())
+        # Saudação pronta para tocar de cada patrocinador, por id (ver preparar_saudacoes)
+        self.saudacoes = {}
+        self.sensor = None
+        # Gatilhos do sensor e do botão: conversa ativa, fila e contadores
+        self.gatilhos = TriggerDispatcher(coalesce=sensor_cooldown)
+        # Permite ao visitante interromper a saudação (ver BARGE_IN)
+        self.barge_in = barge_in
+        # Instante (monotônico) em que o visitante interrompeu a última fala,
+        # ou None se ela tocou até o fim
+        self.last_barge_in = None
+        self._listeners = {}
+        # Loop do orquestrador; a tarefa atual só é lida e trocada dentro dele
+        self._tarefa = None
+        self._loop = asyncio.new_event_loop()
+        Thread(target=self._loop.run_forever, daemon=True).start()
+
+    # --- Eventos para as interfaces ---
+
+    def on(self, event, callback):
+        """Inscreve callback(*args) para ser chamado a cada emissão de event."""
+        self._listeners.setdefault(event, []).append(callback)
+
+    def emit(self, event, *args):
+        for callback in list(self._listeners.get(event, ())):
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"Erro no tratamento do evento '{event}': {e}")
+
+    def atualizar_status(self, texto):
+        self.emit("status", texto)
+
+    # --- Serviços ---
+
+    def iniciar_servicos(self, relatorio=None):
+        """Inicia o áudio, o microfone e os aquecimentos, cada um em uma thread.
+
+        Retorna na hora. O tempo de cada etapa vai para relatorio (um
+        StartupReport), mostrado no console quando todas terminam.
+        """
+        relatorio = relatorio or StartupReport()
+        etapas = [("áudio", self.audio_output.start),
+                  ("microfone", self._iniciar_microfone),
+                  # Pré-aquece o cache de TTS e monta as saudações para não atrasar o primeiro visitante
+                  ("cache de TTS e saudações", self._preparar_fala),
+                  # Aquece o LLM para o modelo já estar carregado no primeiro visitante
+                  ("LLM", self.llm_client.warm_up),
+                  # Carrega o modelo de reconhecimento de fala
+                  ("reconhecimento de fala", self.stt_backend.load)]
+        threads = [Thread(target=relatorio.run, args=etapa, daemon=True) for etapa in etapas]
+        for thread in threads:
+            thread.start()
+
+        def relatar():
+            for thread in threads:
+                thread.join()
+            relatorio.print_report()
+        Thread(target=relatar, daemon=True).start()
+
+    def _iniciar_microfone(self):
+        self.mic_ring.start()
+        self.calibrar_vad()
+
+    def _preparar_fala(self):
+        self.pre_aquecer_cache_tts()
+        ready = getattr(self.audio_output, "ready", None)
+        if ready is not None and ready.wait(timeout=PRAZO_SAUDACAO):
+            self.preparar_saudacoes()
+
+    def fechar(self):
+        """Cancela a conversa em andamento e libera a porta serial ao encerrar."""
+        self.gatilhos.discard_pending()
+        self.cancelar_conversa()
+        if self.sensor is not None:
+            self.sensor.stop()
+
+    def pre_aquecer_cache_tts(self):
+        """Gera antecipadamente o áudio de todas as frases fixas e dos patrocinadores."""
+        patrocinios = [sponsor["frase"] for sponsor in self.patrocinios.sponsors]
+        for frase in [FRASE_BOAS_VINDAS, FRASE_PEDIR_PERGUNTA] + patrocinios:
+            try:
+                self.tts_service.synthesize(frase, lang='pt', slow=False)
+            except Exception as e:
+                print(f"Erro ao pré-gerar áudio de '{frase}': {e}")
+        print("Cache de áudio TTS pronto.")
+
+    def preparar_saudacoes(self):
+        """Carrega do pacote (ou monta) uma saudação contínua para cada patrocinador.
+
+        Cada saudação junta boas-vindas, patrocinador e pedido de pergunta
+        em um só clipe, com o silêncio das pontas aparado, e toca sem
+        síntese nem pausas entre as frases. Exige a saída de áudio já
+        iniciada; saídas sem decode_pcm() seguem com as frases separadas.
+        """
+        audio = self.audio_output
+        if not hasattr(audio, "decode_pcm") or not self.patrocinios.sponsors:
+            return
+        sample_rate, channels = audio.pcm_format()
+        engine = self.tts_service.engine
+        patrocinios = {sponsor["id"]: sponsor["frase"] for sponsor in self.patrocinios.sponsors}
+        key = json.dumps([getattr(engine, "name", type(engine).__name__), sample_rate, channels,
+                          SAUDACAO_PAUSA, SAUDACAO_LIMIAR_SILENCIO, SAUDACAO_MARGEM,
+                          FRASE_BOAS_VINDAS, FRASE_PEDIR_PERGUNTA, patrocinios], ensure_ascii=False)
+        version = hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+        clips = self.greeting_pack.load(version)
+        if clips is None:
+            def frase_pcm(frase):
+                pcm = audio.decode_pcm(self.tts_service.synthesize(frase, lang='pt', slow=False))
+                return aparar_silencio(pcm, sample_rate)
+            inicio, fim = frase_pcm(FRASE_BOAS_VINDAS), frase_pcm(FRASE_PEDIR_PERGUNTA)
+            pausa = np.zeros((int(SAUDACAO_PAUSA * sample_rate), channels), dtype=inicio.dtype)
+            clips = {sponsor_id: np.concatenate([inicio, pausa, frase_pcm(frase), pausa, fim])
+                     for sponsor_id, frase in patrocinios.items()}
+            # Com o mecanismo reserva a voz seria outra: usa só nesta execução
+            if not self.tts_service.degraded:
+                try:
+                    self.greeting_pack.save(version, clips)
+                except OSError as e:
+                    print(f"Erro ao gravar o pacote de saudações: {e}")
+        self.saudacoes = {sponsor_id: audio.sound_from_pcm(pcm) for sponsor_id, pcm in clips.items()}
+        print(f"Saudações prontas: {len(self.saudacoes)} patrocinadores.")
+
+    def calibrar_vad(self):
+        """Calibra o ruído ambiente com o primeiro trecho capturado, antes de qualquer fala."""
+        try:
+            read_frame = self.mic_ring.frame_reader(pre_roll=0)
+            self.vad.calibrate([read_frame() for _ in range(int(VAD_CALIBRATION / self.vad.frame_seconds))])
+            print(f"Ruído ambiente calibrado: RMS {self.vad.noise_floor:.0f}")
+        except OSError as e:
+            print(f"Erro ao calibrar o ruído ambiente: {e}")
+
+    # --- Fala ---
+
+    def play_sound_nonblocking(self, sound_path):
+        """Reproduz um som sem bloquear a thread principal"""
+        try:
+            if os.path.exists(sound_path):
+                self.audio_output.play_effect(sound_path)
+                # Não bloqueia, retorna imediatamente
+            else:
+                print(f"Arquivo de som não encontrado: {sound_path}")
+        except Exception as e:
+            print(f"Erro ao reproduzir som: {e}")
+
+    def speak_sequence(self, frases, speed=1.0, cancel=None, barge_in=False):
+        """Fala uma sequência de frases, sem pausa de síntese entre elas.
+
+        Uma thread produtora sintetiza (ou busca no cache) a frase N+1
+        enquanto a frase N está tocando. Aceita uma lista ou um gerador, como
+        o stream do LLM; cada item é um texto ou um par (texto, áudio já
+        pronto para audio_output.play()). Se o Event cancel for acionado, para após a frase
+        atual e fecha o gerador. Com barge_in=True, o microfone é vigiado
+        durante a fala e a reprodução para assim que o visitante começa a
+        falar (ver last_barge_in). Retorna o texto efetivamente falado.
+        """
+        cancel = cancel or Event()
+        if cancel.is_set():
+            # A conversa acabou antes de a thread chegar aqui: não anuncia fala nenhuma
+            if hasattr(frases, "close"):
+                frases.close()
+            return ""
+        # Interrompida pelo visitante ou cancelada junto com a conversa
+        parar = Event()
+        fila_audio = queue.Queue()
+        self.last_barge_in = None
+
+        def produtor():
+            try:
+                for frase in frases:
+                    if cancel.is_set() or parar.is_set():
+                        break
+                    if isinstance(frase, tuple):
+                        fila_audio.put(frase)
+                        continue
+                    try:
+                        # Busca o áudio no cache (sintetiza apenas na primeira vez)
+                        with self.tracer.span("tts"):
+                            audio = self.tts_service.synthesize(frase, lang='pt', slow=(speed < 1.0))
+                        fila_audio.put((frase, audio))
+                    except Exception as e:
+                        fila_audio.put((frase, e))
+            finally:
+                if hasattr(frases, "close"):
+                    frases.close()  # Encerra o stream do LLM, se ainda estiver aberto
+                fila_audio.put(None)  # Marca o fim da sequência
+
+        Thread(target=produtor, daemon=True).start()
+        fim_da_fala = Event()
+        if barge_in:
+            Thread(target=self._vigiar_interrupcao, args=(parar, fim_da_fala, cancel), daemon=True).start()
+
+        faladas = []
+        self.emit("falando", True)
+        try:
+            while True:
+                item = fila_audio.get()
+                if item is None or cancel.is_set() or parar.is_set():
+                    break
+
+                frase, audio = item
+                if isinstance(audio, Exception):
+                    self.atualizar_status(f"Erro ao reproduzir áudio: {str(audio)}")
+                    print(f"Erro de TTS: {audio}")
+                    continue
+
+                # Carrega e reproduz o áudio e aguarda o fim da reprodução
+                with self.tracer.span("playback"):
+                    self.audio_output.play(audio)
+                    self.audio_output.wait()
+                if cancel.is_set() or parar.is_set():
+                    break
+                faladas.append(frase)
+
+        except Exception as e:
+            self.atualizar_status(f"Erro ao reproduzir áudio: {str(e)}")
+            print(f"Erro de TTS: {e}")
+        finally:
+            fim_da_fala.set()
+            # Cancelada, a thread pode destravar já durante a conversa seguinte;
+            # quem anuncia o fim da fala nesse caso é _conversa
+            if not cancel.is_set():
+                self.emit("falando", False)
+        return " ".join(faladas)
+
+    def _vigiar_interrupcao(self, parar, fim_da_fala, cancel):
+        """Lê o microfone enquanto o assistente fala e para a reprodução se o visitante falar."""
+        try:
+            read_frame = self.mic_ring.frame_reader(pre_roll=0)
+            needed = max(1, int(round(BARGE_IN_MIN_SPEECH / self.vad.frame_seconds)))
+            voiced = 0
+            onset = None
+            while not (fim_da_fala.is_set() or cancel.is_set()):
+                frame = read_frame()
+                if not self.vad.is_barge_in(frame):
+                    voiced = 0
+                    continue
+                if voiced == 0:
+                    onset = time.monotonic() - self.vad.frame_seconds
+                voiced += 1
+                if voiced >= needed and not fim_da_fala.is_set():
+                    self.last_barge_in = onset
+                    self.tracer.mark("barge_in")
+                    parar.set()
+                    self.audio_output.stop()
+                    return
+        except OSError as e:
+            print(f"Erro ao vigiar o microfone durante a fala: {e}")
+
+    def speak(self, text, speed=1.0, cancel=None):
+        """Converte texto em fala (com cache em disco) e reproduz o áudio."""
+        return self.speak_sequence([text], speed=speed, cancel=cancel)
+
+    # --- Escuta ---
+
+    def _esperar_fim_do_audio(self, pre_roll, cancel=None):
+        """Espera o quiosque parar de tocar (fala e bipe, mais o eco) e limita pre_roll.
+
+        Retorna o pre_roll que não alcança o som do próprio alto-falante.
+        """
+        ends_at = getattr(self.audio_output, "ends_at", None)
+        if ends_at is None:
+            return pre_roll
+        while True:
+            restante = ends_at() + MIC_ECHO_TAIL - time.monotonic()
+            if restante <= 0:
+                break
+            if cancel is None:
+                time.sleep(min(restante, 0.05))
+            elif cancel.wait(min(restante, 0.05)):
+                raise ConversaCancelada()
+        return min(pre_roll, time.monotonic() - ends_at() - MIC_ECHO_TAIL)
+
+    def listen(self, cancel=None, pre_roll=MIC_PRE_ROLL, start_timeout=None, avisar_silencio=True,
+               apos_audio=True):
+        """Captura o áudio do microfone e converte em texto.
+
+        A captura começa pre_roll segundos no passado e espera o início da
+        fala por start_timeout segundos (padrão do VAD). Com apos_audio, a
+        escuta só começa quando o quiosque para de tocar, e o pre_roll não
+        volta até esse som. Com avisar_silencio=False, ninguém falar não
+        conta como erro: retorna "" sem o som de erro. Acionar o Event
+        cancel interrompe a captura com ConversaCancelada.
+        """
+        sr = importar("speech_recognition")
+        if apos_audio:
+            pre_roll = self._esperar_fim_do_audio(pre_roll, cancel)
+        self.tracer.mark("listen_start")
+        self.emit("escutando")
+
+        try:
+            # O microfone já está aberto: a leitura começa um pouco antes deste instante
+            leitor = self.mic_ring.frame_reader(pre_roll=pre_roll)
+            def read_frame():
+                if cancel is not None and cancel.is_set():
+                    raise ConversaCancelada()
+                return leitor()
+
+            self.atualizar_status("Fale agora...")
+            with self.tracer.span("capture"):
+                if self.stt_backend.streaming:
+                    # Transcreve enquanto o visitante ainda está falando
+                    self.stt_backend.start()
+                    def on_audio(frame):
+                        parcial = self.stt_backend.accept(frame)
+                        if parcial:
+                            self.atualizar_status("Ouvindo: " + parcial)
+                    pcm = self.vad.capture(read_frame, on_audio, start_timeout)
+                else:
+                    pcm = self.vad.capture(read_frame, start_timeout=start_timeout)
+            self.tracer.mark("vad_end")
+
+            if pcm is None and not avisar_silencio:
+                return ""
+            if pcm is None:
+                raise sr.UnknownValueError()
+            print(f"Fim da fala detectado após {self.vad.last_endpoint_delay:.2f}s de silêncio "
+                  f"({len(pcm) / 2 / self.vad.sample_rate:.1f}s de áudio)")
+
+            with self.tracer.span("stt"):
+                if self.stt_backend.streaming:
+                    text = self.stt_backend.finish()
+                else:
+                    text = self.stt_backend.transcribe(sr.AudioData(pcm, self.vad.sample_rate, 2))
+            self.atualizar_status("Você disse: " + text)
+            return text
+        except sr.UnknownValueError:
+            self.atualizar_status("Não entendi o que foi dito.")
+            # Toca som de erro quando não entende
+            if os.path.exists(ERROR_SOUND_PATH):
+                self.play_sound_nonblocking(ERROR_SOUND_PATH)
+            return ""
+        except sr.RequestError as e:
+            self.atualizar_status("Erro na requisição do serviço.")
+            # Toca som de erro quando há falha na requisição
+            if os.path.exists(ERROR_SOUND_PATH):
+                self.play_sound_nonblocking(ERROR_SOUND_PATH)
+            return ""
+
+    # --- Conversa ---
+
+    def evento_patrocinador(self):
+        """Escolhe o próximo patrocinador do rodízio ({"id", "frase", "peso"}), ou None se não houver."""
+        return self.patrocinios.next()
+
+    def agendar_conversa(self, origem="manual", inicio=None, substituir=False):
+        """Agenda uma conversa no loop do orquestrador e retorna sem esperar por ela.
+
+        Se já houver uma conversa, ela é cancelada quando substituir=True;
+        caso contrário o gatilho passa pelo TriggerDispatcher e pode ficar na
+        fila. Retorna o concurrent.futures.Future da conversa, ou None se
+        ela não foi iniciada agora.
+        """
+        inicio = inicio if inicio is not None else time.monotonic()
+        if self.gatilhos.trigger(origem, inicio, substituir) != TriggerDispatcher.INICIAR:
+            return None
+        return self._agendar(origem, inicio)
+
+    def _agendar(self, origem, inicio):
+        return asyncio.run_coroutine_threadsafe(self._substituir_conversa(origem, inicio), self._loop)
+
+    def iniciar_conversa(self, origem="manual", inicio=None):
+        """Conduz uma conversa (substituindo a atual, se houver) e só retorna quando ela termina."""
+        self.agendar_conversa(origem, inicio, substituir=True).result()
+
+    def cancelar_conversa(self):
+        """Cancela a conversa em andamento, de qualquer thread."""
+        self._loop.call_soon_threadsafe(self._cancelar_tarefa)
+
+    def _cancelar_tarefa(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+
+    async def _substituir_conversa(self, origem, inicio):
+        # Assume a vez antes de esperar a anterior, para que o encerramento
+        # dela não encerre a conversa no TriggerDispatcher
+        anterior, self._tarefa = self._tarefa, asyncio.current_task()
+        if anterior is not None and not anterior.done():
+            anterior.cancel()
+            await asyncio.gather(anterior, return_exceptions=True)
+        await self._conversa(origem, inicio)
+
+    async def _etapa(self, nome, prazo, func, *args):
+        """Roda uma etapa bloqueante em uma thread do executor, com prazo."""
+        try:
+            return await asyncio.wait_for(self._loop.run_in_executor(None, func, *args), prazo)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"a etapa '{nome}' passou de {prazo:g}s") from None
+
+    async def _conversa(self, origem, inicio):
+        """Conduz a conversa com um visitante; origem e inicio identificam o gatilho na medição."""
+        # Sinaliza às threads das etapas que a conversa acabou
+        cancel = Event()
+        atendido = False
+        try:
+            self.tracer.start_turn(origem, inicio)
+            self.emit("conversa", "inicio")
+
+            # Aquece o LLM enquanto a saudação toca, se ele ficou ocioso
+            ultimo_uso = self.llm_client.last_used
+            if ultimo_uso is None or time.monotonic() - ultimo_uso > LLM_AQUECER_APOS:
+                self._loop.run_in_executor(None, self.llm_client.warm_up)
+
+            patrocinador = self.evento_patrocinador()
+            frases = [FRASE_BOAS_VINDAS, FRASE_PEDIR_PERGUNTA]
+            saudacao = None
+            if patrocinador is not None:
+                frases.insert(1, patrocinador["frase"])
+                # O id do patrocinador é a chave da saudação pré-montada
+                saudacao = self.saudacoes.get(patrocinador["id"])
+            if saudacao is not None:
+                # Saudação pré-montada: um único clipe, que começa a tocar na hora
+                frases = [(" ".join(frases), saudacao)]
+            # Sem ela, as três frases tocam em sequência: a próxima é preparada enquanto a atual toca
+            await self._etapa("saudação", PRAZO_SAUDACAO, self.speak_sequence,
+                              frases, 1.0, cancel, self.barge_in)
+
+            if self.last_barge_in is None:
+                # Toca som antes de começar a escutar
+                if os.path.exists(LISTEN_CHIME_PATH):
+                    self.play_sound_nonblocking(LISTEN_CHIME_PATH)
+                    self.tracer.mark("chime")
+                pre_roll = MIC_PRE_ROLL
+            else:
+                # O visitante já está falando: a escuta volta até o início da fala
+                pre_roll = min(time.monotonic() - self.last_barge_in + VAD_PRE_SPEECH, MIC_BUFFER_SECONDS)
+
+            comando = await self._etapa("escuta", PRAZO_ESCUTA, self.listen, cancel, pre_roll,
+                                        None, True, self.last_barge_in is None)
+
+            # Sessão: o visitante pode emendar outras perguntas sem novo gatilho
+            historico = ConversationHistory()
+            perguntas = 0
+            while comando:
+                await self._responder(comando, historico, cancel)
+                perguntas += 1
+                if perguntas >= SESSAO_MAX_PERGUNTAS:
+                    break
+                if os.path.exists(LISTEN_CHIME_PATH):
+                    self.play_sound_nonblocking(LISTEN_CHIME_PATH)
+                self.atualizar_status("Mais alguma pergunta?")
+                # Silêncio aqui só encerra a sessão: o visitante pode ter ido embora
+                comando = await self._etapa("escuta", PRAZO_ESCUTA, self.listen, cancel,
+                                            MIC_PRE_ROLL, SESSAO_SILENCIO, False)
+
+            # Após concluir a conversa, reseta o estado do sensor
+            self.atualizar_status("Conversa concluída. Aguardando nova ativação do sensor...")
+            atendido = True
+
+        except asyncio.CancelledError:
+            self.audio_output.stop()
+            self.atualizar_status("Conversa interrompida. Aguardando nova ativação do sensor...")
+        except TimeoutError as e:
+            self.audio_output.stop()
+            self.atualizar_status(f"Tempo esgotado: {e}")
+            print(f"Tempo esgotado na conversa: {e}")
+        except Exception as e:
+            self.atualizar_status(f"Erro na conversa: {str(e)}")
+            print(f"Erro na conversa: {e}")
+        finally:
+            # Encerra a etapa que ainda estiver rodando em thread
+            cancel.set()
+            self.emit("falando", False)
+            self.tracer.finish_turn()
+            # Uma conversa que foi substituída não encerra a que a substituiu
+            if self._tarefa is asyncio.current_task():
+                self._tarefa = None
+                proximo = self.gatilhos.finished(atendido)
+                stats = self.gatilhos.stats()
+                print(f"Visitantes: {stats['accepted']} aceitos, {stats['served']} atendidos, "
+                      f"{stats['failed']} sem resposta, {stats['dropped']} descartados "
+                      f"({stats['coalesced']} sinais agrupados, {stats['rejected']} recusados)")
+                if proximo is not None:
+                    # Visitante da fila: a espera dele conta na medição desde o gatilho
+                    self.atualizar_status("Atendendo o próximo visitante...")
+                    self._loop.create_task(self._substituir_conversa(*proximo))
+            self.emit("conversa", "fim")
+
+    async def _responder(self, comando, historico, cancel):
+        """Fala a resposta de uma pergunta e a registra no histórico da sessão."""
+        # Uma pergunta de seguimento depende das anteriores, então o cache
+        # de respostas só vale para a primeira pergunta da sessão
+        resposta = self.answer_cache.get(comando) if not historico else None
+        if resposta:
+            # Pergunta repetida: sem LLM, e o áudio das frases já está no cache de TTS
+            frases = dividir_frases(resposta) if LLM_STREAMING else [resposta]
+            await self._etapa("resposta", PRAZO_RESPOSTA, self.speak_sequence, frases, 1.0, cancel)
+            historico.add(comando, resposta)
+            return
+
+        mensagens = historico.messages()
+        if LLM_STREAMING:
+            resposta = await self._etapa("resposta", PRAZO_RESPOSTA, self.speak_sequence,
+                                         self.llm_client.ask_stream(comando, mensagens), 1.0, cancel)
+        else:
+            resposta = await self._etapa("resposta", PRAZO_RESPOSTA, self._perguntar_e_falar,
+                                         comando, mensagens, cancel)
+        # O cache guarda o texto completo do servidor, não só as frases que
+        # tocaram: uma frase com erro de TTS não pode sumir da resposta guardada.
+        # Sem last_answer (stream interrompido) a resposta não é guardada
+        completa = self.llm_client.last_answer
+        if resposta and self.llm_client.last_error is None:
+            if completa and not historico:
+                self.answer_cache.put(comando, completa.strip())
+            historico.add(comando, completa or resposta)
+
+    def _perguntar_e_falar(self, comando, mensagens, cancel):
+        resposta = self.llm_client.ask(comando, mensagens)
+        self.speak(resposta, speed=1.0, cancel=cancel)
+        return resposta
+
+    # --- Sensor (porta serial) ---
+
+    def processar_linha_serial(self, line, recebido_em=None):
+        """Trata uma linha recebida do Arduino; SINAL_ENTRADA (LED_ON) inicia a conversa.
+
+        Retorna True se o visitante foi aceito (conversa iniciada ou na fila).
+        """
+        self.atualizar_status(f"Recebido: {line}")
+        recebido_em = recebido_em if recebido_em is not None else time.monotonic()
+
+        if contem_sinal(line, SINAL_ENTRADA):
+            decisao = self.gatilhos.trigger("sensor", recebido_em)
+            if decisao == TriggerDispatcher.INICIAR:
+                self.atualizar_status("Sensor ativado! Iniciando conversa...")
+                # Sem bipe aqui: a saudação começa na hora, e o bipe (2 s) tocaria
+                # por cima dela. Ele fica só para avisar o início da escuta
+                # Agenda a conversa no orquestrador para não bloquear o monitoramento
+                self._agendar("sensor", recebido_em)
+                return True
+            if decisao == TriggerDispatcher.FILA:
+                print(f"Sinal {SINAL_ENTRADA}: visitante na fila até o fim da conversa atual")
+                return True
+            # Pulsos repetidos do mesmo visitante, ou fila já ocupada
+            print(f"Sinal {SINAL_ENTRADA} ignorado ({decisao})")
+            return False
+        if SINAL_SAIDA and contem_sinal(line, SINAL_SAIDA):
+            if self.gatilhos.active:
+                self.atualizar_status("Visitante saiu. Encerrando conversa...")
+                self.cancelar_conversa()
+            return False
+        print(f"Linha do sensor ignorada: {line[:80]!r}")
+        return False
+
+    def iniciar_sensor(self, port=PORTA_COM, last_port_file=SERIAL_LAST_PORT_FILE, find_ports=descobrir_portas):
+        """Inicia o leitor da porta serial; se já estiver rodando, não cria outro.
+
+        find_ports() lista as portas candidatas quando port não responde.
+        """
+        if not serial:
+            self.atualizar_status("Módulo serial não disponível. Instale com 'pip install pyserial'")
+            # Toca som de erro
+            if os.path.exists(ERROR_SOUND_PATH):
+                self.play_sound_nonblocking(ERROR_SOUND_PATH)
+            return False
+        if self.sensor is None:
+            self.sensor = SerialSensorReader(self.processar_linha_serial, self._status_sensor, port=port,
+                                             find_ports=find_ports, last_port_file=last_port_file)
+        self.sensor.start()
+        return True
+
+    def reconectar_sensor(self):
+        """Reconecta a porta serial agora (botão "Reconectar Serial")."""
+        if self.sensor is None:
+            return self.iniciar_sensor()
+        self.sensor.reconnect()
+        return True
+
+    def _status_sensor(self, texto, erro):
+        self.atualizar_status(texto)
+        # Toca som de erro quando a conexão falha
+        if erro and os.path.exists(ERROR_SOUND_PATH):
+            self.play_sound_nonblocking(ERROR_SOUND_PATH)
+
+def montar_saudacoes():
+    """Gera o pacote de saudações antes do evento, para o quiosque já iniciar com ele."""
+    motor = AssistenteMotor()
+    motor.audio_output.start()
+    motor.preparar_saudacoes()
+    print(f"Pacote de saudações em {motor.greeting_pack.directory}")
+
+def main():
+    """Executa o quiosque sem janela: o status vai para o console e o sensor inicia as conversas."""
+    parser = argparse.ArgumentParser(description="Assistente virtual do quiosque, sem janela")
+    parser.add_argument("--montar-saudacoes", action="store_true",
+                        help="só gera o pacote de saudações (uma por patrocinador) e sai")
+    args = parser.parse_args()
+    if args.montar_saudacoes:
+        montar_saudacoes()
+        return
+
+    relatorio = StartupReport(INICIO_PROCESSO)
+    with relatorio.stage("motor"):
+        motor = AssistenteMotor()
+    motor.on("status", lambda texto: print(f"[status] {texto}"))
+    motor.iniciar_servicos(relatorio)
+    try:
+        if motor.iniciar_sensor():
+            while True:
+                time.sleep(1.0)
+        else:
+            # Sem sensor, cada Enter no console inicia uma conversa
+            while True:
+                input("Pressione Enter para iniciar uma conversa...\n")
+                motor.iniciar_conversa("manual", time.monotonic())
+    except (KeyboardInterrupt, EOFError):
+        pass
+    finally:
+        motor.fechar()
+
+if __name__ == "__main__":
+    main()
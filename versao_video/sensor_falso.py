@@ -0,0 +1,59 @@
+"""Sensor de presença falso: um pseudo-terminal (pty) que imita o Arduino.
+
+O lado "escravo" do pty se comporta como uma porta serial de verdade, então
+o SerialSensorReader do motor se conecta a ele sem saber que não há
+hardware. Só funciona em sistemas POSIX (Linux, macOS).
+
+Uso:
+    python sensor_falso.py            # mostra a porta; cada Enter envia LED_ON
+    python motor.py                   # com PORTA_COM apontando para essa porta
+"""
+import argparse
+import os
+import time
+import tty
+
+class SensorFalso:
+    """Dispositivo serial simulado; as linhas enviadas chegam a quem abrir self.port."""
+
+    def __init__(self):
+        self.master, self.slave = os.openpty()
+        # Modo bruto: sem eco nem conversão de fim de linha, como uma porta USB
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+
+    def enviar(self, linha, fim="\r\n"):
+        """Envia uma linha como o Serial.println() do Arduino."""
+        self.enviar_bytes((linha + fim).encode("utf-8"))
+
+    def enviar_bytes(self, data, pedaco=None, intervalo=0.0):
+        """Envia bytes crus, opcionalmente em pedaços, para testar a separação de linhas."""
+        pedaco = pedaco or len(data) or 1
+        for i in range(0, len(data), pedaco):
+            os.write(self.master, data[i:i + pedaco])
+            if intervalo:
+                time.sleep(intervalo)
+
+    def fechar(self):
+        """Fecha o dispositivo, como se o cabo USB fosse desconectado."""
+        for fd in (self.master, self.slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sensor de presença falso em um pty")
+    parser.add_argument("--linha", default="LED_ON", help="linha enviada a cada Enter")
+    args = parser.parse_args()
+
+    sensor = SensorFalso()
+    print(f"Sensor falso em {sensor.port} (Enter envia {args.linha}, Ctrl+C encerra)")
+    try:
+        while True:
+            texto = input().strip()
+            sensor.enviar(texto or args.linha)
+    except (KeyboardInterrupt, EOFError):
+        pass
+    finally:
+        sensor.fechar()
@@ -0,0 +1,144 @@
+"""Servidor LLM de teste, compatível com /v1/chat/completions da API OpenAI.
+
+Substitui o servidor local (LM Studio) em testes e medições de latência:
+responde sempre com um texto fixo, com atraso configurável até o primeiro
+token e entre tokens, tanto no modo normal quanto em streaming (SSE).
+
+Uso:
+    python servidor_llm_teste.py --port 1234 --first-token 0.3 --token-delay 0.02
+"""
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+RESPOSTA_PADRAO = ("Olá! Eu sou o assistente virtual do evento. "
+                   "Os banheiros ficam no fim do corredor, à direita. "
+                   "Posso ajudar em mais alguma coisa?")
+
+class ChatHandler(BaseHTTPRequestHandler):
+    """Responde às requisições de chat com a resposta configurada no servidor."""
+
+    # HTTP/1.1 mantém a conexão aberta (keep-alive) entre requisições
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self.send_error(404)
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self.send_error(400, "JSON inválido")
+            return
+
+        self.server.requests_served += 1
+        tokens = self.server.tokens(payload.get("max_tokens"))
+        time.sleep(self.server.first_token_delay)
+
+        if payload.get("stream"):
+            self._send_stream(payload, tokens)
+        else:
+            time.sleep(self.server.token_delay * max(len(tokens) - 1, 0))
+            self._send_json(payload, "".join(tokens))
+
+    def _send_json(self, payload, text):
+        body = json.dumps({
+            "id": "chatcmpl-teste",
+            "object": "chat.completion",
+            "model": payload.get("model", "teste"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                         "finish_reason": "stop"}],
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, payload, tokens):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        try:
+            for i, token in enumerate(tokens):
+                if i:
+                    time.sleep(self.server.token_delay)
+                chunk = {
+                    "id": "chatcmpl-teste",
+                    "object": "chat.completion.chunk",
+                    "model": payload.get("model", "teste"),
+                    "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+                }
+                self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+            self._write_chunk("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # O cliente fechou o stream antes do fim (conversa cancelada): é normal
+            self.close_connection = True
+
+    def _write_chunk(self, text):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+class ServidorLLMTeste(ThreadingHTTPServer):
+    """Servidor HTTP com a resposta e os atrasos de geração configuráveis."""
+
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 1234), resposta=RESPOSTA_PADRAO,
+                 first_token_delay=0.0, token_delay=0.0, verbose=False):
+        super().__init__(address, ChatHandler)
+        self.resposta = resposta
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.verbose = verbose
+        self.requests_served = 0
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def tokens(self, max_tokens=None):
+        """Divide a resposta em "tokens" (palavras com o espaço anterior)."""
+        words = self.resposta.split(" ")
+        tokens = [words[0]] + [" " + w for w in words[1:]]
+        if max_tokens:
+            tokens = tokens[:max_tokens]
+        return tokens
+
+def iniciar_servidor(port=0, **kwargs):
+    """Inicia o servidor em uma thread de fundo e o retorna (port=0 escolhe uma porta livre)."""
+    server = ServidorLLMTeste(("127.0.0.1", port), **kwargs)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor LLM de teste para o assistente virtual")
+    parser.add_argument("--port", type=int, default=1234)
+    parser.add_argument("--first-token", type=float, default=0.0, help="atraso (s) até o primeiro token")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="atraso (s) entre tokens")
+    parser.add_argument("--resposta", default=RESPOSTA_PADRAO)
+    args = parser.parse_args()
+
+    server = ServidorLLMTeste(("127.0.0.1", args.port), resposta=args.resposta,
+                              first_token_delay=args.first_token, token_delay=args.token_delay,
+                              verbose=True)
+    print(f"Servidor LLM de teste em {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,54 @@
+"""Testes dos contadores de visitantes (TriggerDispatcher).
+
+Uso:
+    python -m unittest test_gatilhos
+"""
+import unittest
+
+from motor import TriggerDispatcher
+
+def balanco(gatilhos):
+    """Visitantes aceitos menos os que já têm destino (atendido, sem resposta, descartado, ativo, fila)."""
+    stats = gatilhos.stats()
+    return stats["accepted"] - (stats["served"] + stats["failed"] + stats["dropped"]
+                                + stats["active"] + stats["pending"])
+
+class TriggerDispatcherTest(unittest.TestCase):
+
+    def test_aceitos_sempre_fecham_a_conta(self):
+        gatilhos = TriggerDispatcher(coalesce=1.0, pending_ttl=10.0)
+        passos = [
+            lambda: gatilhos.trigger("sensor", at=0.0),                # inicia
+            lambda: gatilhos.trigger("sensor", at=0.5),                # agrupado
+            lambda: gatilhos.trigger("sensor", at=2.0),                # fila
+            lambda: gatilhos.trigger("sensor", at=4.0),                # recusado: fila cheia
+            lambda: gatilhos.finished(served=False, now=5.0),          # falhou; o da fila assume
+            lambda: gatilhos.trigger("sensor", at=7.0),                # fila
+            lambda: gatilhos.trigger("botao", at=8.0, replace=True),   # substitui a ativa
+            lambda: gatilhos.finished(now=20.0),                       # atendido; o da fila expirou
+            lambda: gatilhos.trigger("sensor", at=30.0),               # inicia
+            lambda: gatilhos.trigger("sensor", at=32.0),               # fila
+            lambda: gatilhos.discard_pending(),                        # encerrando o programa
+            lambda: gatilhos.finished(now=33.0),
+        ]
+        for i, passo in enumerate(passos):
+            passo()
+            self.assertEqual(balanco(gatilhos), 0, (i, gatilhos.stats()))
+
+        self.assertEqual(gatilhos.stats(), {
+            "accepted": 6, "served": 2, "failed": 1, "dropped": 3, "coalesced": 1, "rejected": 1,
+            "pending": False, "active": False,
+        })
+
+    def test_sinais_agrupados_e_recusados_nao_sao_visitantes(self):
+        gatilhos = TriggerDispatcher(coalesce=1.0, pending_ttl=10.0)
+        self.assertEqual(gatilhos.trigger("sensor", at=0.0), TriggerDispatcher.INICIAR)
+        self.assertEqual(gatilhos.trigger("sensor", at=0.2), TriggerDispatcher.AGRUPADO)
+        self.assertEqual(gatilhos.trigger("sensor", at=3.0), TriggerDispatcher.FILA)
+        self.assertEqual(gatilhos.trigger("sensor", at=5.0), TriggerDispatcher.DESCARTADO)
+        stats = gatilhos.stats()
+        self.assertEqual((stats["accepted"], stats["dropped"]), (2, 0))
+        self.assertEqual((stats["coalesced"], stats["rejected"]), (1, 1))
+
+if __name__ == "__main__":
+    unittest.main()
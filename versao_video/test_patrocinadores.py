@@ -0,0 +1,48 @@
+"""Testes do rodízio de patrocinadores (SponsorRotation).
+
+Uso:
+    python -m unittest test_patrocinadores
+"""
+import random
+import unittest
+from collections import Counter
+
+from motor import SponsorRotation
+
+def rodizio(pesos, seed):
+    sponsors = [{"id": sponsor_id, "frase": sponsor_id, "peso": peso} for sponsor_id, peso in pesos.items()]
+    return SponsorRotation(sponsors, state_path=None, rng=random.Random(seed))
+
+def repeticoes(sequencia):
+    return sum(a == b for a, b in zip(sequencia, sequencia[1:]))
+
+class SponsorRotationTest(unittest.TestCase):
+
+    def test_sem_repeticao_seguida_quando_evitavel(self):
+        # Em todas estas configurações dá para nunca repetir, inclusive na emenda das rodadas
+        for pesos in ({"a": 1, "b": 1, "c": 1}, {"a": 2, "b": 1, "c": 1}, {"a": 3, "b": 2, "c": 1, "d": 1}):
+            for seed in range(20):
+                rotation = rodizio(pesos, seed)
+                sequencia = [rotation.next()["id"] for _ in range(10 * sum(pesos.values()))]
+                self.assertEqual(repeticoes(sequencia), 0, (pesos, seed, sequencia))
+
+    def test_peso_maior_espalhado_na_rodada(self):
+        for seed in range(20):
+            rotation = rodizio({"a": 3, "b": 1, "c": 1}, seed)
+            rodada = [rotation.next()["id"] for _ in range(5)]
+            self.assertEqual(rodada, ["a", rodada[1], "a", rodada[3], "a"])
+
+    def test_cada_rodada_respeita_os_pesos(self):
+        pesos = {"a": 3, "b": 2, "c": 1}
+        rotation = rodizio(pesos, 1)
+        for _ in range(5):
+            rodada = Counter(rotation.next()["id"] for _ in range(sum(pesos.values())))
+            self.assertEqual(dict(rodada), pesos)
+
+    def test_pesos_iguais_todos_antes_de_repetir(self):
+        rotation = rodizio({sponsor_id: 1 for sponsor_id in "abcdefg"}, 3)
+        for _ in range(4):
+            self.assertEqual(len({rotation.next()["id"] for _ in range(7)}), 7)
+
+if __name__ == "__main__":
+    unittest.main()